@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact precomputed aggregate bundle that is shipped to the browser once so the
+year slider and dropdowns can be handled by Dash clientside callbacks
+(see assets/clientside.js) without a server roundtrip.
+
+Only the per-year county counts, catalyst stats, acreage ranking and the daily
+series are bundled. The counties are listed once and every year only carries
+its fire counts aligned with that list, which keeps national data at a few
+hundred KB. Figures that need the individual fires (monthly animation,
+fire size scatter plots) are still rendered by the server.
+"""
+import json
+import numpy as np
+import pandas as pd
+from Collection_Aggregation import COUNTIES_GEOJSON_URL, MapCreator, ChartCreator
+
+# map-dropdown and chart-dropdown values that are drawn in the browser
+BUNDLED_MAPS = ["show_full_year_map"]
+BAR_CHARTS = {"show_fire_catalysts_single_year": ('catalysts', 'catalyst', 'fire_count', "Fires by Catalyst"),
+              "show_largest_fires_table_single_year": ('acres', 'county', 'total_acres_burnt', "Acreage Burnt by County"),
+              "show_fire_catalysts_avg_single_year": ('catalyst_avg', 'catalyst', 'fire_avg_size', "Average Fire Catalysts by County"),
+              "show_largest_individual_fires_single_year": ('largest', 'fire', 'fire_size', "Largest Individual Fires")}
+LINE_CHARTS = {"show_firesize_v_precip": ('b30', 'p30'),
+               "show_avg_firesize_counts_w": ('a7', 'f7')}
+BUNDLED_CHARTS = list(BAR_CHARTS) + list(LINE_CHARTS)
+DAILY_COLUMNS = sorted({col for cols in LINE_CHARTS.values() for col in cols})
+
+
+def _column(values, decimals=2):
+    # plain json list, rounded to keep the bundle small and with NaN sent as null
+    values = pd.Series(values)
+    if values.dtype.kind == 'f':
+        values = values.round(decimals).astype(object).where(values.notnull(), None)
+    return values.tolist()
+
+
+def _table(df, columns):
+    return {col: _column(df[col]) for col in columns}
+
+
+def _skeleton(fig):
+    # figure as plain json with the trace data removed, the browser fills it back in
+    fig = json.loads(fig.to_json())
+    for trace in fig['data']:
+        for key in ('x', 'y', 'z', 'locations', 'text'):
+            if key in trace:
+                trace[key] = []
+    return fig
+
+
+def _countyCounts(years, fireCountsByYear, countyLookup):
+    # one fips/name table for every county with fires, and per year the fire counts aligned with it (0 = no fires)
+    fips = sorted(set().union(*(fireCountsByYear.get(year)['fips'] for year in years)))
+    counties = {'fips': fips, 'county': countyLookup[np.array(fips, dtype=int)].tolist()}
+    position = pd.Index(fips)
+    counts = {}
+    for year in years:
+        yearCounts = fireCountsByYear.get(year)
+        fireCount = np.zeros(len(fips), dtype=int)
+        fireCount[position.get_indexer(yearCounts['fips'])] = yearCounts['fire_count'].values
+        counts[year] = {'fire_count': fireCount.tolist()}
+    return counties, counts
+
+
+def buildClientBundle(years, fireCountsByYear, yearlyData, caliCounties, daily, allsize, countyLookup, rankings=None):
+    years = sorted(int(year) for year in years)
+    first = years[0]
+    bundle = {'maps': {}, 'charts': {}, 'years': {}}
+
+    MapVisualizer = MapCreator(yearlyData, caliCounties, daily, first, BUNDLED_MAPS[0], countyLookup, rankings)
+    bundle['maps']["show_full_year_map"] = {
+        'figure': _skeleton(MapVisualizer.MakeWildfireMap(COUNTIES_GEOJSON_URL, fireCountsByYear.get(first)))}
+
+    for dropdown, (table, xVar, yVar, title) in BAR_CHARTS.items():
+        ChartVisualizer = ChartCreator(yearlyData, caliCounties, daily, allsize, first, dropdown, countyLookup, rankings)
+        bundle['charts'][dropdown] = {'figure': _skeleton(ChartVisualizer.DetermineWhichPlot()),
+                                      'kind': 'bar', 'table': table, 'x': xVar, 'y': yVar, 'title': title}
+
+    for dropdown, (y1, y2) in LINE_CHARTS.items():
+        ChartVisualizer = ChartCreator(yearlyData, caliCounties, daily, allsize, first, dropdown, countyLookup, rankings)
+        fig = ChartVisualizer.DetermineWhichPlot()
+        # per year titles, e.g. "No Precipitation Data" once the precipitation series ends
+        titles = {}
+        for year in years:
+            ChartVisualizer.year = year
+            titles[str(year)] = ChartVisualizer.DetermineWhichPlot().layout.title.text
+        bundle['charts'][dropdown] = {'figure': _skeleton(fig), 'kind': 'lines', 'y1': y1, 'y2': y2, 'titles': titles}
+
+    bundle['counties'], counts = _countyCounts(years, fireCountsByYear, countyLookup)
+    Aggregator = ChartCreator(yearlyData, caliCounties, daily, allsize, first, None, countyLookup, rankings)
+    for year in years:
+        bundle['years'][str(year)] = {
+            'counts': counts[year],
+            'catalysts': _table(Aggregator.getFireCatalystsByYear(year), ['catalyst', 'fire_count']),
+            'catalyst_avg': _table(Aggregator.getAvgFireCatalystsByYear(year), ['catalyst', 'fire_avg_size']),
+            'acres': _table(Aggregator.getMostAcresBurntFipsByYear(year), ['county', 'total_acres_burnt']),
+            'largest': _table(Aggregator.getLargestFiresByYear(year), ['fire', 'fire_size']),
+        }
+
+    fd = daily[daily['date'].dt.year.isin(years)]
+    bundle['daily'] = _table(fd, DAILY_COLUMNS)
+    bundle['daily']['date'] = fd['date'].dt.strftime('%Y-%m-%d').tolist()
+    return bundle
@@ -0,0 +1,106 @@
+import gzip
+import json
+import unittest
+import numpy as np
+import pandas as pd
+from Collection_Aggregation import *
+from Client_Bundle import *
+from Figure_Prerender import renderMap, renderChart
+from Synthetic_Data import buildSharedData
+
+# the bundle is sent with the (gzip compressed) layout, national data has to stay at a few hundred KB
+MAX_BUNDLE_BYTES = 1024 * 1024
+MAX_COMPRESSED_BUNDLE_BYTES = 300 * 1024
+
+
+def bundleArgs(data):
+    return (data['years'], data['fireCountsByYear'], data['yearlyData'], data['caliCounties'], data['daily'],
+            data['allsize'], data['countyLookup'], data['rankings'])
+
+
+def nationalData(nCounties=3000, years=range(1992, 2016), firesPerYear=20000):
+    # about as many counties and years as the full US dataset, only what the bundle reads
+    rng = np.random.default_rng(0)
+    codes = 1001 + np.arange(nCounties) * 10
+    counties = pd.DataFrame({'fips': ['{0:0>5}'.format(code) for code in codes],
+                             'county': ['County ' + str(code) for code in codes]})
+    countyLookup = CaliforniaYearlyCounty.getCountyLookup(counties)
+    frames = []
+    for year in years:
+        dates = pd.Timestamp(str(year)) + pd.to_timedelta(rng.integers(0, 365, firesPerYear), unit='D')
+        frames.append(pd.DataFrame({'OBJECTID': np.arange(firesPerYear),
+                                    'FIRE_YEAR': year,
+                                    'STAT_CAUSE_DESCR': rng.choice(['Arson', 'Lightning', 'Debris Burning', 'Miscellaneous'], firesPerYear),
+                                    'FIRE_SIZE': np.round(rng.exponential(80, firesPerYear), 2),
+                                    'STCT_FIPS': rng.choice(codes, firesPerYear),
+                                    'DATETIME': dates.strftime('%Y-%m-%d')}))
+    fires = pd.concat(frames, ignore_index=True)
+    fires['STCT_FIPS'] = FirePrecipDataCollection.padFips(fires['STCT_FIPS'])
+    days = pd.date_range(str(years[0]), str(years[-1]) + '-12-31')
+    daily = pd.DataFrame({'date': days})
+    for col in ['b30', 'p30', 'a7', 'f7']:
+        daily[col] = rng.random(len(days)) * 100
+    CountyDataCollector = CaliforniaYearlyCounty(years[0], fires, list(years))
+    yearlyData = CountyDataCollector.getYearlyDataDict()
+    aggregator = FireAggregations(yearlyData, counties, daily, countyLookup)
+    fireCountsByYear = {year: aggregator.getFireCountsByYear(year).sort_values('fips') for year in years}
+    return {'years': list(years), 'fireCountsByYear': fireCountsByYear, 'yearlyData': yearlyData, 'caliCounties': counties,
+            'daily': daily, 'allsize': fires['FIRE_SIZE'], 'countyLookup': countyLookup,
+            'rankings': FireRankings(yearlyData, countyLookup)}
+
+
+class ClientBundle_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = buildSharedData()
+        cls.years = sorted(int(year) for year in cls.data['years'])
+        cls.bundle = buildClientBundle(*bundleArgs(cls.data))
+
+    def test_layout(self):
+        self.assertEqual(sorted(self.bundle), ['charts', 'counties', 'daily', 'maps', 'years'])
+        self.assertEqual(list(self.bundle['maps']), BUNDLED_MAPS)
+        self.assertEqual(list(self.bundle['charts']), BUNDLED_CHARTS)
+        self.assertEqual(list(self.bundle['years']), [str(year) for year in self.years])
+        self.assertEqual(sorted(self.bundle['years'][str(self.years[0])]), ['acres', 'catalyst_avg', 'catalysts', 'counts', 'largest'])
+
+    def test_skeleton_has_no_trace_data(self):
+        for spec in list(self.bundle['maps'].values()) + list(self.bundle['charts'].values()):
+            for trace in spec['figure']['data']:
+                for key in ('x', 'y', 'z', 'locations', 'text'):
+                    self.assertEqual(trace.get(key, []), [])
+
+    def test_counties_listed_once(self):
+        counties = self.bundle['counties']
+        self.assertEqual(counties['fips'], sorted(set(counties['fips'])))
+        self.assertEqual(counties['county'], self.data['countyLookup'][np.array(counties['fips'], dtype=int)].tolist())
+        for year in self.years:
+            self.assertNotIn('county', self.bundle['years'][str(year)]['counts'])
+
+    def test_counts_match_server_map(self):
+        counties = self.bundle['counties']
+        for year in self.years:
+            counts = self.bundle['years'][str(year)]['counts']['fire_count']
+            self.assertEqual(len(counts), len(counties['fips']))
+            trace = renderMap(self.data, year, "show_full_year_map").data[0]
+            shown = [i for i, count in enumerate(counts) if count > 0]
+            self.assertEqual([counties['fips'][i] for i in shown], list(trace.locations))
+            self.assertEqual([counts[i] for i in shown], list(trace.z))
+            self.assertEqual([counties['county'][i] for i in shown], list(trace.text))
+
+    def test_bar_tables_match_server_chart(self):
+        for dropdown, (table, xVar, yVar, _title) in BAR_CHARTS.items():
+            for year in self.years:
+                trace = renderChart(self.data, year, dropdown).data[0]
+                bundled = self.bundle['years'][str(year)][table]
+                self.assertEqual(bundled[xVar], list(trace.x), dropdown)
+                np.testing.assert_allclose(bundled[yVar], list(trace.y), atol=0.01)
+
+    def test_national_bundle_size(self):
+        bundle = json.dumps(buildClientBundle(*bundleArgs(nationalData()))).encode('utf-8')
+        self.assertLess(len(bundle), MAX_BUNDLE_BYTES)
+        self.assertLess(len(gzip.compress(bundle)), MAX_COMPRESSED_BUNDLE_BYTES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,27 +5,42 @@ Created on Fri Apr 23 14:50:32 2021
 
 @author: Timothy Tyree
 """
+import os
+import shutil
+import tempfile
+import threading
 import pandas as pd
 import numpy as np
 from urllib.request import urlopen
 import json
+from types import MappingProxyType
 import plotly.graph_objs as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.figure_factory as ff
 
+COUNTIES_GEOJSON_URL = 'https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json'
+
 class FirePrecipDataCollection:
 
-    def __init__(self, year, firePath, precipPath):
+    def __init__(self, year, firePath, precipPath, precipStorePath=None):
         self.year = year
         self.firePath = firePath
         self.precipPath = precipPath
+        self.precipStorePath = precipStorePath                                              # optional PrecipitationStore directory, built from precipPath on first use
         
     def readInData(self, path):
         data = pd.read_csv(path)
-        data['STCT_FIPS'] = data['STCT_FIPS'].apply(lambda x: '{0:0>5}'.format(x))          # padding the fips code with a 0 to make it 5 digits - needed for geographic mapping
+        data['STCT_FIPS'] = self.padFips(data['STCT_FIPS'])
         return data
 
+    @staticmethod
+    def padFips(fips):
+        # the fips code becomes a categorical county key, so only the few thousand distinct codes
+        # are padded with 0s to 5 digits (needed for geographic mapping) instead of every row
+        fips = fips.astype('category')
+        return fips.cat.rename_categories(['{0:0>5}'.format(code) for code in fips.cat.categories])
+
     def getFiresData(self):
         fires = self.readInData(self.firePath)
         fires = fires[fires['FIRE_YEAR'] >= self.year]                                      # reducing years in the map due to latency issues
@@ -39,8 +54,11 @@ class FirePrecipDataCollection:
         return precip
     
     def prepPrecipDailyData(self):
-        precipData = self.getPrecipData()
-        pdaily = precipData.groupby('date').sum()['station_sum']/10                         # overall rainfall in inches
+        if self.precipStorePath is not None:
+            pdaily = PrecipitationStore.open(self.precipPath, self.precipStorePath).getNationalDaily()/10
+        else:
+            precipData = self.getPrecipData()
+            pdaily = precipData.groupby('date')['station_sum'].sum()/10                     # overall rainfall in inches
         pdaily = pd.DataFrame(pdaily)                                                       # overall rainfall df
         pdaily['p30'] = pdaily['station_sum'].rolling(30).sum()                             # rainfall in the last 30 days
         pdaily = pdaily.reset_index(0)[pdaily.reset_index()['date'].dt.year >= self.year]
@@ -49,11 +67,11 @@ class FirePrecipDataCollection:
     def prepFireDailyData(self):
         fires = self.readInData(self.firePath)
         fireData = fires[fires['FIRE_YEAR'] >= self.year-1]
-        fireData['date'] = pd.to_datetime(list(map(str, fireData['DATETIME'])))
-        fdaily =pd.DataFrame(fireData.groupby('date').sum()['FIRE_SIZE'])                   # same process for fire size
+        fireData = fireData.assign(date=pd.to_datetime(list(map(str, fireData['DATETIME']))))
+        fdaily =pd.DataFrame(fireData.groupby('date')['FIRE_SIZE'].sum())                   # same process for fire size
         fdaily['b30'] = fdaily['FIRE_SIZE'].rolling(30).sum()
-        fdaily['f7'] = fireData.groupby('date').count()['OBJECTID'].rolling(7).sum()
-        fdaily['f30'] = fireData.groupby('date').count()['OBJECTID'].rolling(30).sum()
+        fdaily['f7'] = fireData.groupby('date')['OBJECTID'].count().rolling(7).sum()
+        fdaily['f30'] = fireData.groupby('date')['OBJECTID'].count().rolling(30).sum()
         fdaily['b7'] = fdaily['FIRE_SIZE'].rolling(7).sum()
         fdaily = fdaily.reset_index(0)[fdaily.reset_index()['date'].dt.year >= self.year]
         return fdaily
@@ -67,6 +85,110 @@ class FirePrecipDataCollection:
         return daily
 
 
+class PrecipitationStore:
+    '''
+    County x day precipitation arrays, built once from the precipitation csv and
+    memory mapped afterwards so every worker shares the same pages instead of
+    reading the csv into its own DataFrame
+    '''
+
+    COLUMNS = {'station_sum': 'station_sum.npy', 'past30_ss_sum': 'past30_ss_sum.npy'}
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.fips = meta['fips']
+        self.fipsIndex = {fips: i for i, fips in enumerate(self.fips)}
+        self.start = pd.Timestamp(meta['start'])
+        self.arrays = {col: np.load(os.path.join(path, name), mmap_mode='r') for col, name in self.COLUMNS.items()}
+        self.national = np.load(os.path.join(path, 'national.npy'), mmap_mode='r')
+        self.dates = pd.date_range(self.start, periods=len(self.national), freq='D')
+
+    @classmethod
+    def open(cls, csvPath, path):
+        # (re)builds the store when it is missing or older than the csv
+        if not cls.isCurrent(csvPath, path):
+            cls.build(csvPath, path)
+        return cls(path)
+
+    @staticmethod
+    def isCurrent(csvPath, path):
+        meta = os.path.join(path, 'meta.json')
+        return os.path.exists(meta) and os.path.getmtime(meta) >= os.path.getmtime(csvPath)
+
+    @classmethod
+    def build(cls, csvPath, path):
+        precip = pd.read_csv(csvPath, usecols=['STCT_FIPS', 'date'] + list(cls.COLUMNS))
+        fips = FirePrecipDataCollection.padFips(precip['STCT_FIPS'])
+        dates = precip['date'].astype('category')                                           # only the distinct dates are parsed
+        dayDates = pd.to_datetime(list(map(str, dates.cat.categories)))
+        start = dayDates.min()
+        days = np.asarray((dayDates - start).days)[dates.cat.codes.values]
+        counties = fips.cat.codes.values
+        nCounties, nDays = len(fips.cat.categories), days.max() + 1
+        cells = counties * nDays + days
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmpPath = tempfile.mkdtemp(dir=parent)                                              # unique per build, swapped in so readers never see a partial store
+        for col, name in cls.COLUMNS.items():
+            # duplicate (county, day) rows are summed like the national series, cells without any reading stay NaN
+            readings = precip[col].values
+            present = ~np.isnan(readings)
+            filled, inverse = np.unique(cells[present], return_inverse=True)
+            values = np.lib.format.open_memmap(os.path.join(tmpPath, name), mode='w+', dtype=np.float64, shape=(nCounties, nDays))
+            values[:] = np.nan
+            values.reshape(-1)[filled] = np.bincount(inverse, weights=readings[present])
+            values.flush()
+            del values
+        # national daily sum, NaN on days without any reading so they can be skipped like missing groupby rows
+        national = np.bincount(days, weights=np.nan_to_num(precip['station_sum'].values), minlength=nDays)
+        national[np.bincount(days, minlength=nDays) == 0] = np.nan
+        np.save(os.path.join(tmpPath, 'national.npy'), national)
+        with open(os.path.join(tmpPath, 'meta.json'), 'w') as f:
+            json.dump({'fips': list(fips.cat.categories), 'start': str(start.date())}, f)
+        if cls.isCurrent(csvPath, path):                                                    # another process swapped in its build of the same csv first
+            shutil.rmtree(tmpPath, ignore_errors=True)
+            return
+        # the outdated store is renamed aside and only deleted once the new one is in place, the live directory is never emptied
+        oldPath = tmpPath + '.old'
+        try:
+            os.replace(path, oldPath)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmpPath, path)
+        except OSError:                                                                     # lost the race between the two renames, the other build is the same
+            shutil.rmtree(tmpPath, ignore_errors=True)
+        shutil.rmtree(oldPath, ignore_errors=True)
+
+    def dayIndex(self, date):
+        return (pd.Timestamp(date) - self.start).days
+
+    def getValue(self, fips, date, col='station_sum'):
+        day = self.dayIndex(date)
+        if fips not in self.fipsIndex or not 0 <= day < len(self.dates):
+            return np.nan
+        return float(self.arrays[col][self.fipsIndex[fips], day])
+
+    def getDaily(self, fips, date):
+        return self.getValue(fips, date, 'station_sum')
+
+    def getPast30(self, fips, date):
+        return self.getValue(fips, date, 'past30_ss_sum')
+
+    def getCountySeries(self, fips, col='station_sum'):
+        return pd.Series(self.arrays[col][self.fipsIndex[fips]], index=self.dates, name=col)
+
+    def getNationalDaily(self):
+        # same as summing the csv by date, only the days that have readings are returned
+        present = ~np.isnan(self.national)
+        pdaily = pd.Series(self.national[present], index=self.dates[present], name='station_sum')
+        pdaily.index.name = 'date'
+        return pdaily
+
+
 class CaliforniaYearlyCounty:
 
     def __init__(self, year, fires, years):
@@ -79,11 +201,11 @@ class CaliforniaYearlyCounty:
         for year in self.years:
             filtered = self.fires[self.fires['FIRE_YEAR'] == year]
             yearlyData[year] = filtered
-        return yearlyData
+        return MappingProxyType(yearlyData)                                                 # shared by every request, handed out read only
 
 
     def getCaliGeoJson(self):
-        with urlopen('https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json') as response:
+        with urlopen(COUNTIES_GEOJSON_URL) as response:
             counties = json.load(response)
         return counties
 
@@ -96,71 +218,108 @@ class CaliforniaYearlyCounty:
         d = {'fips':fips,'county':county}
         df = pd.DataFrame(d)
         return df
-    
+
+    @staticmethod
+    def getCountyLookup(counties):
+        # array indexed by the integer fips code holding the county name, None where there is no county
+        lookup = np.full(100000, None, dtype=object)
+        lookup[counties['fips'].astype(int).values] = counties['county'].values
+        return lookup
+
+    @staticmethod
+    def addCountyNames(df, lookup):
+        # replaces merging with the county names on the fips strings, unknown fips are dropped like the inner merge did
+        county = lookup[df['fips'].astype(int).values]
+        df = df.assign(county=county)[pd.notnull(county)]
+        return df.reset_index(drop=True)
+
     def getFireCountsByYear(self):
         fireCountsByYear = {}
+        lookup = self.getCountyLookup(self.getCountyNames(self.getCaliGeoJson()))
         for year, yearDF in self.getYearlyDataDict().items():
-            filtered_fips = yearDF['OBJECTID'].groupby(yearDF['STCT_FIPS']).count().to_frame().reset_index()
+            filtered_fips = yearDF['OBJECTID'].groupby(yearDF['STCT_FIPS'], observed=True).count().sort_index().to_frame().reset_index()
             filtered_fips = filtered_fips.rename(columns={'OBJECTID': 'fire_count', 'STCT_FIPS': 'fips'})
-            filtered_fips = filtered_fips.merge(self.getCountyNames(self.getCaliGeoJson()), on="fips")
+            filtered_fips['fips'] = filtered_fips['fips'].astype(str)
+            filtered_fips = self.addCountyNames(filtered_fips, lookup)
             fireCountsByYear[year] = filtered_fips
-        return fireCountsByYear 
+        return MappingProxyType(fireCountsByYear)
 
 class FireAggregations:
 
-    def __init__(self, yearlyData, caliCounties, daily):
+    def __init__(self, yearlyData, caliCounties, daily, countyLookup=None, rankings=None):
         self.yearlyData = yearlyData
         self.caliCounties = caliCounties
         self.daily = daily
+        if countyLookup is None:                                                            # pass a precomputed lookup to skip rebuilding it per instance
+            countyLookup = CaliforniaYearlyCounty.getCountyLookup(caliCounties)
+        self.countyLookup = countyLookup
+        self.rankings = rankings                                                            # optional FireRankings, answers the ranking queries without sorting
     
     def getMonthlyCounts(self, year):
         yearDF = self.yearlyData.get(year)
-        months = yearDF.groupby(['STCT_FIPS', 'MONTH'])['OBJECTID'].count().to_frame().reset_index()
+        months = yearDF.groupby(['STCT_FIPS', 'MONTH'], observed=True)['OBJECTID'].count().sort_index().to_frame().reset_index()
+        months['STCT_FIPS'] = months['STCT_FIPS'].astype(str)
         return months
     
     # standard way to perform a number of different groupby operations to avoid repetitive code
     def performGroupOperation(self, year, aggCol, groupCol, newAggCol, newGroupCol, groupCol2="MONTH", Type=None, ascending=False):
         yearDF = self.yearlyData.get(year)
         if Type == "Count":
-            groupedData = yearDF[aggCol].groupby(yearDF[groupCol]).count().sort_values(ascending=ascending)
+            groupedData = yearDF[aggCol].groupby(yearDF[groupCol], observed=True).count().sort_values(ascending=ascending)
             #groupedData = yearDF.groupby([groupCol, groupCol2])[aggCol].count()
         elif Type == "Sum":
-            groupedData = yearDF[aggCol].groupby(yearDF[groupCol]).sum().sort_values(ascending=ascending)
+            groupedData = yearDF[aggCol].groupby(yearDF[groupCol], observed=True).sum().sort_values(ascending=ascending)
         elif Type == "Mean":
-            groupedData = yearDF.groupby(yearDF[groupCol])[aggCol].mean().sort_values(ascending=ascending)
+            groupedData = yearDF.groupby(yearDF[groupCol], observed=True)[aggCol].mean().sort_values(ascending=ascending)
         groupedData = groupedData.to_frame()
         groupedData.reset_index(inplace=True)
         groupedData = groupedData.rename(columns={aggCol: newAggCol, groupCol: newGroupCol})
+        if groupedData[newGroupCol].dtype.name == 'category':                               # the grouped keys are few, hand them back as plain strings
+            groupedData[newGroupCol] = groupedData[newGroupCol].astype(str)
         return groupedData
     
     def getFireCountsByYear(self, year):
         filtered_fips = self.performGroupOperation(year, 'OBJECTID', 'STCT_FIPS', 'fire_count', 'fips', Type="Count", ascending=True)
-        filtered_fips = filtered_fips.merge(self.caliCounties, on="fips")
+        filtered_fips = CaliforniaYearlyCounty.addCountyNames(filtered_fips, self.countyLookup)
         return filtered_fips
     
     
     # For "Histogram of fire catalysts count (single year)" graph aka "show_fire_catalysts_single_year"
     def getFireCatalystsByYear(self, year):
+        if self.rankings is not None:
+            return self.rankings.getCatalystsByCount(year)
         catalysts = self.performGroupOperation(year, 'OBJECTID', 'STAT_CAUSE_DESCR', 'fire_count', 'catalyst', Type="Count")
         return catalysts
 
     # For "Most destructive fires (single year)", aka "show_largest_fires_table_single_year"
-    def getMostAcresBurntFipsByYear(self, year):
-        acresBurnt = self.performGroupOperation(year, 'FIRE_SIZE', 'STCT_FIPS', 'total_acres_burnt', 'fips', Type="Sum")
-        acresBurnt = acresBurnt.merge(self.caliCounties, on="fips")
-        acresBurnt = acresBurnt.sort_values(by='total_acres_burnt', ascending=False)[:10]
-        return acresBurnt
+    def getMostAcresBurntFipsByYear(self, year, k=10):
+        if self.rankings is not None and k <= self.rankings.k:
+            return self.rankings.getTopCountiesByAcres(year, k)
+        return FireRankings.rankCounties(self.yearlyData.get(year), self.countyLookup, k, 'FIRE_SIZE', 'total_acres_burnt')
+
+    # top k counties by number of fires
+    def getMostFiresFipsByYear(self, year, k=10):
+        if self.rankings is not None and k <= self.rankings.k:
+            return self.rankings.getTopCountiesByFireCount(year, k)
+        return FireRankings.rankCounties(self.yearlyData.get(year), self.countyLookup, k)
+
+    # For "Largest individual fires (single year)", aka "show_largest_individual_fires_single_year"
+    def getLargestFiresByYear(self, year, k=10):
+        if self.rankings is not None and k <= self.rankings.k:
+            return self.rankings.getLargestFires(year, k)
+        return FireRankings.rankFires(self.yearlyData.get(year), self.countyLookup, k)
 
     # For "Histogram of fire catalysts average (single year)" graph aka "show_fire_catalysts_avg_single_year"
     def getAvgFireCatalystsByYear(self, year):
+        if self.rankings is not None:
+            return self.rankings.getCatalystsByAvg(year)
         catalysts = self.performGroupOperation(year, 'FIRE_SIZE', 'STAT_CAUSE_DESCR', 'fire_avg_size', 'catalyst', Type="Mean")
         return catalysts
 
     # For "Fire size over time (single year)" graph aka "show_fire_over_time_single_year",
     def getFireOverTimeByYear(self, year):
         yearDF = self.yearlyData.get(year)
-        fires = yearDF[['DATETIME', 'FIRE_SIZE']]
-        fires.reset_index(inplace=True)
+        fires = yearDF[['DATETIME', 'FIRE_SIZE']].reset_index()                             # new frame, the shared yearly data is never modified
         fires = fires.rename(columns={'FIRE_SIZE': 'fire_size', 'DATETIME': 'Time'})
         return fires
     
@@ -180,11 +339,250 @@ class FireAggregations:
         allsize = [self.yearlyData.get(x)['FIRE_SIZE'] for x in self.yearlyData]
         allsize = pd.concat(allsize)
         return allsize
-    
+
+
+class FireRankings:
+    '''
+    Per year ranking indexes built once up front. Only the k largest entries are
+    selected (argpartition) and sorted, so ranking queries are slices at request time.
+    The index is shared between requests, the getters hand out copies
+    '''
+
+    def __init__(self, yearlyData, countyLookup, k=25):
+        self.k = k
+        countiesByAcres = {}
+        countiesByCount = {}
+        largestFires = {}
+        catalystsByCount = {}
+        catalystsByAvg = {}
+        aggregator = FireAggregations(yearlyData, None, None, countyLookup)
+        for year, yearDF in yearlyData.items():
+            countiesByAcres[year] = self.rankCounties(yearDF, countyLookup, k, 'FIRE_SIZE', 'total_acres_burnt')
+            countiesByCount[year] = self.rankCounties(yearDF, countyLookup, k)
+            largestFires[year] = self.rankFires(yearDF, countyLookup, k)
+            catalystsByCount[year] = aggregator.getFireCatalystsByYear(year)                # only a dozen catalysts, their full order is kept
+            catalystsByAvg[year] = aggregator.getAvgFireCatalystsByYear(year)
+        self.countiesByAcres = MappingProxyType(countiesByAcres)
+        self.countiesByCount = MappingProxyType(countiesByCount)
+        self.largestFires = MappingProxyType(largestFires)
+        self.catalystsByCount = MappingProxyType(catalystsByCount)
+        self.catalystsByAvg = MappingProxyType(catalystsByAvg)
+
+    @staticmethod
+    def topK(values, k):
+        # positions of the k largest values, largest first, without sorting the rest
+        values = np.where(np.isnan(values), -np.inf, values)
+        k = min(k, len(values))
+        if k <= 0:
+            return np.array([], dtype=int)
+        top = np.argpartition(-values, k - 1)[:k]
+        return top[np.argsort(-values[top], kind='stable')]
+
+    @staticmethod
+    def rankCounties(yearDF, countyLookup, k, weightCol=None, valueCol='fire_count'):
+        # per county fire counts (or sums of weightCol) straight from the categorical codes
+        fips = yearDF['STCT_FIPS'].cat
+        codes = fips.codes.values
+        valid = codes >= 0
+        nCodes = len(fips.categories)
+        counts = np.bincount(codes[valid], minlength=nCodes)
+        if weightCol is None:
+            totals = counts
+        else:
+            totals = np.bincount(codes[valid], weights=np.nan_to_num(yearDF[weightCol].values[valid]), minlength=nCodes)
+        county = countyLookup[np.asarray(fips.categories.astype(int))]
+        candidates = np.flatnonzero((counts > 0) & pd.notnull(county))                   # counties without a name are left out like the inner merge did
+        top = candidates[FireRankings.topK(totals[candidates].astype(float), k)]
+        return pd.DataFrame({'fips': np.asarray(fips.categories[top], dtype=object),
+                             valueCol: totals[top],
+                             'county': county[top]})
+
+    @staticmethod
+    def rankFires(yearDF, countyLookup, k):
+        fires = yearDF.iloc[FireRankings.topK(yearDF['FIRE_SIZE'].values.astype(float), k)]
+        fips = np.asarray(fires['STCT_FIPS'].astype(str), dtype=object)
+        county = countyLookup[fips.astype(int)]
+        county = np.where(pd.notnull(county), county, fips)
+        # the rank keeps the labels unique, fires of one complex often share county and date and px.bar would stack them
+        return pd.DataFrame({'fire': ["{0}. {1} ({2})".format(rank, name, date) for rank, (name, date) in enumerate(zip(county, fires['DATETIME']), 1)],
+                             'fips': fips,
+                             'county': county,
+                             'catalyst': fires['STAT_CAUSE_DESCR'].values,
+                             'Time': fires['DATETIME'].values,
+                             'fire_size': fires['FIRE_SIZE'].values})
+
+    def getTopCountiesByAcres(self, year, k=10):
+        return self.countiesByAcres.get(year)[:k].copy()
+
+    def getTopCountiesByFireCount(self, year, k=10):
+        return self.countiesByCount.get(year)[:k].copy()
+
+    def getLargestFires(self, year, k=10):
+        return self.largestFires.get(year)[:k].copy()
+
+    def getCatalystsByCount(self, year):
+        return self.catalystsByCount.get(year).copy()
+
+    def getCatalystsByAvg(self, year):
+        return self.catalystsByAvg.get(year).copy()
+
+
+class WeatherFireCorrelations:
+    '''
+    Rolling and lagged correlations between the precipitation of the last 30 days (p30)
+    and the fire activity of the last 30 days (b30 acres, f30 fires), nationally and per
+    county. The series are handled as arrays (cumulative sums for the rolling windows,
+    one FFT for all lags) and every year range is computed once and cached, precompute()
+    fills the cache before the app starts serving
+    '''
+
+    WINDOWS = (30, 90, 365)                                                                 # rolling correlation windows in days
+    MAX_LAG = 120                                                                           # fire activity trailing precipitation by up to this many days
+    FIRE_COLUMNS = ('b30', 'f30')
+
+    def __init__(self, daily, fires=None, precipStore=None, countyLookup=None):
+        self.daily = daily
+        self.fires = fires                                                                  # fires and precipStore are only needed per county
+        self.precipStore = precipStore
+        self.countyLookup = countyLookup
+        self.countySeries = None
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def windowSums(values, window):
+        # sums over every trailing window along the last axis
+        totals = np.cumsum(values, axis=-1)
+        totals = np.concatenate([np.zeros(values.shape[:-1] + (1,)), totals], axis=-1)
+        return totals[..., window:] - totals[..., :-window]
+
+    @staticmethod
+    def rollingCorrelation(x, y, window):
+        # pearson correlation of the trailing window ending on each day, NaN while the window is incomplete or has gaps
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        corr = np.full(np.broadcast(x, y).shape, np.nan)
+        if corr.shape[-1] < window:
+            return corr
+        valid = ~(np.isnan(x) | np.isnan(y))
+        count = valid.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):                                # centered first to keep the sums small, all NaN series stay NaN
+            x = np.where(valid, x - np.where(valid, x, 0.0).sum(axis=-1, keepdims=True) / count, 0.0)
+            y = np.where(valid, y - np.where(valid, y, 0.0).sum(axis=-1, keepdims=True) / count, 0.0)
+        windowSums = WeatherFireCorrelations.windowSums
+        count = windowSums(valid.astype(float), window)
+        sx, sy = windowSums(x, window), windowSums(y, window)
+        cov = windowSums(x * y, window) - sx * sy / window
+        varx = windowSums(x * x, window) - sx * sx / window
+        vary = windowSums(y * y, window) - sy * sy / window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = cov / np.sqrt(varx * vary)
+        values[(count < window) | (varx <= 0) | (vary <= 0)] = np.nan
+        corr[..., window - 1:] = values
+        return corr
+
+    @staticmethod
+    def crossCorrelation(x, y, maxLag):
+        # correlation of x on day t with y on day t + lag for every lag in -maxLag..maxLag, gaps count as the mean
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        length = x.shape[-1]
+        maxLag = max(min(maxLag, length - 1), 0)
+        lags = np.arange(-maxLag, maxLag + 1)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        count = valid.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = np.where(valid, x - np.where(valid, x, 0.0).sum(axis=-1, keepdims=True) / count, 0.0)
+            y = np.where(valid, y - np.where(valid, y, 0.0).sum(axis=-1, keepdims=True) / count, 0.0)
+            size = 1 << int(2 * length - 1).bit_length()                                    # zero padded so the circular correlation does not wrap
+            cross = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+            cross = cross[..., lags % size]
+            norm = np.sqrt((x * x).sum(axis=-1, keepdims=True) * (y * y).sum(axis=-1, keepdims=True))
+            corr = np.where(norm > 0, cross / norm, np.nan)                                 # NaN for flat or empty series
+        return lags, corr
+
+    def cached(self, key, compute):
+        with self.lock:
+            if key not in self.cache:
+                self.cache[key] = compute()
+            return self.cache[key]
+
+    def getNational(self, startYear, endYear):
+        # (cross, rolling) frames: correlation by lag and rolling correlations by date for the years
+        return self.cached(('national', startYear, endYear), lambda: self.computeNational(startYear, endYear))
+
+    def computeNational(self, startYear, endYear):
+        years = self.daily['date'].dt.year
+        fd = self.daily[(years >= startYear) & (years <= endYear)]
+        p30 = fd['p30'].values
+        cross = {}
+        rolling = {'date': fd['date'].values}
+        for col in self.FIRE_COLUMNS:
+            lags, cross[col] = self.crossCorrelation(p30, fd[col].values, self.MAX_LAG)
+            for window in self.WINDOWS:
+                rolling['{0}_{1}'.format(col, window)] = self.rollingCorrelation(p30, fd[col].values, window)
+        cross = pd.DataFrame(dict({'lag': lags}, **cross))
+        return cross, pd.DataFrame(rolling)
+
+    def buildCountySeries(self):
+        # county x day p30 and b30/f30 matrices on the calendar of the precipitation store
+        store = self.precipStore
+        nCounties, nDays = len(store.fips), len(store.dates)
+        fips = self.fires['STCT_FIPS'].cat
+        rowOfCode = np.array([store.fipsIndex.get(code, -1) for code in fips.categories] + [-1])
+        rows = rowOfCode[fips.codes.values]                                                 # code -1 (missing fips) picks the trailing -1
+        dates = self.fires['DATETIME'].astype('category')
+        dayOfCode = np.asarray((pd.to_datetime(list(map(str, dates.cat.categories))) - store.start).days)
+        days = dayOfCode[dates.cat.codes.values]
+        keep = (rows >= 0) & (days >= 0) & (days < nDays)
+        cells = rows[keep] * nDays + days[keep]
+        acres = np.bincount(cells, weights=self.fires['FIRE_SIZE'].values[keep], minlength=nCounties * nDays).reshape(nCounties, nDays)
+        counts = np.bincount(cells, minlength=nCounties * nDays).reshape(nCounties, nDays).astype(float)
+        padding = np.zeros((nCounties, 29))
+        return {'date': store.dates,
+                'p30': np.asarray(store.arrays['past30_ss_sum']) / 10,                      # inches, like the national series
+                'b30': self.windowSums(np.concatenate([padding, acres], axis=1), 30),
+                'f30': self.windowSums(np.concatenate([padding, counts], axis=1), 30)}
+
+    def getCounties(self, startYear, endYear):
+        # per county correlation at lag 0 and the lag with the strongest correlation for the years
+        return self.cached(('county', startYear, endYear), lambda: self.computeCounties(startYear, endYear))
+
+    def computeCounties(self, startYear, endYear):
+        if self.countySeries is None:                                                       # built on first use, cached() holds the lock
+            self.countySeries = self.buildCountySeries()
+        series = self.countySeries
+        years = series['date'].year
+        days = (years >= startYear) & (years <= endYear)
+        fips = self.precipStore.fips
+        counties = {'fips': fips}
+        if self.countyLookup is not None:
+            counties['county'] = self.countyLookup[np.array(fips, dtype=int)]
+        p30 = series['p30'][:, days]
+        for col in self.FIRE_COLUMNS:
+            lags, corr = self.crossCorrelation(p30, series[col][:, days], self.MAX_LAG)
+            strongest = np.argmax(np.where(np.isnan(corr), -1, np.abs(corr)), axis=1)
+            found = ~np.isnan(corr).all(axis=1)                                             # counties without readings have no best lag
+            counties[col + '_corr'] = corr[:, lags == 0][:, 0]
+            bestLag = pd.array(lags[strongest], dtype='Int64')
+            bestLag[~found] = pd.NA
+            counties[col + '_best_lag'] = bestLag
+            counties[col + '_best_corr'] = corr[np.arange(len(fips)), strongest]
+        return pd.DataFrame(counties)
+
+    def precompute(self, years):
+        # every single year (the slider) and the full range, so callbacks only read the cache
+        years = sorted(int(year) for year in years)
+        ranges = [(year, year) for year in years] + [(years[0], years[-1])]
+        for startYear, endYear in ranges:
+            self.getNational(startYear, endYear)
+            if self.fires is not None and self.precipStore is not None:
+                self.getCounties(startYear, endYear)
+
 class MapCreator(FireAggregations):
 
-    def __init__(self, yearlyData, caliCounties, daily, year, dropdown):
-        FireAggregations.__init__(self, yearlyData, caliCounties, daily)
+    def __init__(self, yearlyData, caliCounties, daily, year, dropdown, countyLookup=None, rankings=None):
+        FireAggregations.__init__(self, yearlyData, caliCounties, daily, countyLookup, rankings)
         self.year = year
         self.dropdown = dropdown
         
@@ -259,11 +657,12 @@ class MapCreator(FireAggregations):
 
 class ChartCreator(FireAggregations):
 
-    def __init__(self, yearlyData, caliCounties, daily, allsize, year, dropdown):
-        FireAggregations.__init__(self, yearlyData, caliCounties, daily)
+    def __init__(self, yearlyData, caliCounties, daily, allsize, year, dropdown, countyLookup=None, rankings=None, correlations=None):
+        FireAggregations.__init__(self, yearlyData, caliCounties, daily, countyLookup, rankings)
         self.year = year
         self.dropdown = dropdown
         self.allsize = allsize
+        self.correlations = correlations                                                    # precomputed WeatherFireCorrelations, required by the correlation chart
 
     def ChartStyling(self, fig, t="B", yLabel=None, xLabel=None):
         fig_layout = fig["layout"]
@@ -329,6 +728,26 @@ class ChartCreator(FireAggregations):
         self.ChartStyling(fig, t="L2")
         return fig
 
+    def correlationPlot(self):
+        if self.correlations is None:                                                       # the FFTs are too slow to run inside a callback
+            raise ValueError("correlationPlot needs the precomputed WeatherFireCorrelations passed as correlations")
+        cross, _rolling = self.correlations.getNational(self.year, self.year)
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=cross['lag'], y=cross['b30'], name="Area burned in last 30 days"))
+        fig.add_trace(go.Scatter(x=cross['lag'], y=cross['f30'], name="Number of fires in last 30 days"))
+        fig.update_layout(title_text="Precipitation and Fire Activity Correlation",
+                            legend = dict(
+                            orientation = "h",
+                            x=0,
+                            y=1.1
+                            ),)
+        fig.update_xaxes(title_text="Days fire activity trails precipitation")
+        fig.update_yaxes(title_text="Correlation with precipitation in last 30 days", range=[-1, 1])
+        self.ChartStyling(fig, t="L2")
+        if cross[['b30', 'f30']].isnull().all().all():
+            fig.update_layout(title_text="No Precipitation Data")
+        return fig
+
     def DetermineWhichPlot(self):
 
         if self.dropdown == "show_fire_catalysts_single_year":
@@ -339,6 +758,10 @@ class ChartCreator(FireAggregations):
             acres_burnt_by_year = self.getMostAcresBurntFipsByYear(self.year)
             fig = self.BarChart(acres_burnt_by_year, 'county', 'total_acres_burnt', "Acreage Burnt by County", "Acres Burnt", "County")
 
+        elif self.dropdown == "show_largest_individual_fires_single_year":
+            largest_fires_by_year = self.getLargestFiresByYear(self.year)
+            fig = self.BarChart(largest_fires_by_year, 'fire', 'fire_size', "Largest Individual Fires", "Fire", "Acres Burnt")
+
         elif self.dropdown == "show_fire_catalysts_avg_single_year":
             catalysts_by_year_avg = self.getAvgFireCatalystsByYear(self.year)
             fig = self.BarChart(catalysts_by_year_avg, 'catalyst', 'fire_avg_size', "Average Fire Catalysts by County", "Number of Fires", "Fire Catalyst")
@@ -382,6 +805,9 @@ class ChartCreator(FireAggregations):
                                     y2_title = 'Number of Fires in last 7 days',
                                     y2_units = 'Count of Fires')
 
+        elif self.dropdown == "show_precip_fire_correlation":
+            fig = self.correlationPlot()
+
 # =============================================================================
 #         elif self.dropdown == 'show_firesize_hist':
 #            
@@ -1,4 +1,9 @@
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+import warnings
 import numpy as np
 from numpy import nan
 import pandas as pd
@@ -29,7 +34,12 @@ class FirePrecipDataCollection_Test(unittest.TestCase):
                                        'DATETIME': {0: '2005-02-02', 1: '2005-08-24', 2: '2005-08-25'},
                                        'MONTH': {0: 'February', 1: 'August', 2: 'August'}})
         fires, _years = self.DataCollector.getFiresData()
-        pd.testing.assert_frame_equal(fires.head(3), expected_fires)
+        pd.testing.assert_frame_equal(fires.head(3).astype({'STCT_FIPS': object}), expected_fires)
+
+    def test_getFiresData_fips_categorical(self):
+        fires, _years = self.DataCollector.getFiresData()
+        self.assertEqual(fires['STCT_FIPS'].dtype.name, 'category')
+        self.assertTrue(all(len(fips) == 5 for fips in fires['STCT_FIPS'].cat.categories))
     
     def test_getFiresData_fires_shape(self):
         fires, _years = self.DataCollector.getFiresData()
@@ -71,7 +81,7 @@ class FirePrecipDataCollection_Test(unittest.TestCase):
                                         'month': {450069: 12, 450070: 12, 450071: 1},
                                         'day': {450069: 30, 450070: 31, 450071: 1}})
         precip = self.DataCollector.getPrecipData()
-        pd.testing.assert_frame_equal(precip.tail(3), expected_precip, check_dtype=True)
+        pd.testing.assert_frame_equal(precip.tail(3).astype({'STCT_FIPS': object}), expected_precip, check_dtype=True)
 
     def test_getPrecipData_shape(self):
         precip = self.DataCollector.getPrecipData()
@@ -95,6 +105,73 @@ class FirePrecipDataCollection_Test(unittest.TestCase):
         daily = self.DataCollector.mergeFirePrecipDataDaily()
         self.assertEqual(daily.shape, (4580, 10))
 
+class PrecipitationStore_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.mkdtemp()
+        cls.csvPath = os.path.join(cls.tmpDir, 'precip.csv')
+        pd.DataFrame({'STCT_FIPS': [6063, 6063, 6115, 6115, 6063],
+                      'date': [20131230, 20131231, 20131231, 20140101, 20140102],
+                      'station_sum': [1.0, 2.0, 3.0, nan, 5.0],
+                      'past30_ss_sum': [10.0, 12.0, 13.0, 13.0, 17.0]}).to_csv(cls.csvPath, index=False)
+        cls.store = PrecipitationStore.open(cls.csvPath, os.path.join(cls.tmpDir, 'store'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpDir)
+
+    def test_getDaily(self):
+        self.assertEqual(self.store.getDaily('06063', '2013-12-31'), 2.0)
+        self.assertEqual(self.store.getDaily('06115', '2013-12-31'), 3.0)
+        self.assertTrue(np.isnan(self.store.getDaily('06115', '2013-12-30')))
+        self.assertTrue(np.isnan(self.store.getDaily('06001', '2013-12-30')))
+
+    def test_getPast30(self):
+        self.assertEqual(self.store.getPast30('06063', '2014-01-02'), 17.0)
+
+    def test_getNationalDaily(self):
+        expected = pd.read_csv(self.csvPath)
+        expected['date'] = pd.to_datetime(list(map(str, expected['date'])))
+        expected = expected.groupby('date')['station_sum'].sum()
+        pd.testing.assert_series_equal(self.store.getNationalDaily(), expected, check_freq=False)
+
+    def test_duplicate_rows_summed(self):
+        csvPath = os.path.join(self.tmpDir, 'duplicates.csv')
+        pd.DataFrame({'STCT_FIPS': [6063, 6063, 6063, 6115],
+                      'date': [20131231, 20131231, 20140101, 20131231],
+                      'station_sum': [1.0, 2.0, 4.0, 8.0],
+                      'past30_ss_sum': [10.0, 12.0, 13.0, 13.0]}).to_csv(csvPath, index=False)
+        store = PrecipitationStore.open(csvPath, os.path.join(self.tmpDir, 'duplicates'))
+        self.assertEqual(store.getDaily('06063', '2013-12-31'), 3.0)
+        self.assertEqual(store.getPast30('06063', '2013-12-31'), 22.0)
+        national = store.getNationalDaily()
+        self.assertEqual(national[pd.Timestamp('2013-12-31')], store.getDaily('06063', '2013-12-31') + store.getDaily('06115', '2013-12-31'))
+
+    def test_concurrent_builds(self):
+        path = os.path.join(self.tmpDir, 'concurrent')
+        threads = [threading.Thread(target=PrecipitationStore.build, args=(self.csvPath, path)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(PrecipitationStore(path).getDaily('06063', '2013-12-31'), 2.0)
+        self.assertEqual([name for name in os.listdir(self.tmpDir) if name.startswith('tmp')], [])          # no partial build left behind
+
+    def test_rebuild_outdated_store(self):
+        path = os.path.join(self.tmpDir, 'outdated')
+        PrecipitationStore.build(self.csvPath, path)
+        meta = os.path.join(path, 'meta.json')
+        os.utime(meta, (0, 0))
+        store = PrecipitationStore(path)                                                                 # a reader of the old store
+        self.assertEqual(PrecipitationStore.open(self.csvPath, path).getDaily('06063', '2013-12-31'), 2.0)
+        self.assertGreaterEqual(os.path.getmtime(meta), os.path.getmtime(self.csvPath))
+        self.assertEqual(store.getDaily('06063', '2013-12-31'), 2.0)                                    # its memory maps stay valid
+        mtime = os.path.getmtime(meta)
+        PrecipitationStore.build(self.csvPath, path)                                                     # a current store is kept as it is
+        self.assertEqual(os.path.getmtime(meta), mtime)
+        self.assertEqual([name for name in os.listdir(self.tmpDir) if name.startswith('tmp')], [])
+
 class CaliforniaYearlyCounty_Test(unittest.TestCase):
 
     @classmethod
@@ -120,6 +197,28 @@ class CaliforniaYearlyCounty_Test(unittest.TestCase):
         caliCounties = self.CountyDataCollector.getCountyNames(cali)
         self.assertEqual(caliCounties.shape, (58, 2))
 
+class CountyLookup_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        counties = pd.DataFrame({'fips': ['06001', '06063', '53033'], 'county': ['Alameda', 'Plumas', 'King']})
+        cls.lookup = CaliforniaYearlyCounty.getCountyLookup(counties)
+
+    def test_padFips(self):
+        DataCollector = FirePrecipDataCollection(startYear, FIREPATH, PRECIP_PATH)
+        fips = DataCollector.padFips(pd.Series([6063, 53033, 6063]))
+        self.assertEqual(fips.dtype.name, 'category')
+        self.assertEqual(fips.astype(str).tolist(), ['06063', '53033', '06063'])
+
+    def test_getCountyLookup(self):
+        self.assertEqual(self.lookup[[6001, 6063, 53033]].tolist(), ['Alameda', 'Plumas', 'King'])
+        self.assertIsNone(self.lookup[6003])
+
+    def test_addCountyNames(self):
+        df = pd.DataFrame({'fips': ['06063', '06003', '06001'], 'fire_count': [3, 2, 1]})
+        expected_df = pd.DataFrame({'fips': ['06063', '06001'], 'fire_count': [3, 1], 'county': ['Plumas', 'Alameda']})
+        pd.testing.assert_frame_equal(CaliforniaYearlyCounty.addCountyNames(df, self.lookup), expected_df, check_dtype=False)
+
 class FireAggregations_Test(unittest.TestCase):
 
     @classmethod
@@ -206,6 +305,154 @@ class FireAggregations_Test(unittest.TestCase):
         allsize = self.FireAggregator.getAllFireSizes()
         self.assertEqual(allsize.shape,(99228,))
 
+class FireRankings_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        yearDF = pd.DataFrame({'OBJECTID': [1, 2, 3, 4, 5, 6],
+                               'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series([6063, 6063, 6001, 6115, 6001, 6003])),
+                               'STAT_CAUSE_DESCR': ['Arson', 'Lightning', 'Arson', 'Arson', 'Lightning', 'Arson'],
+                               'FIRE_SIZE': [5.0, 7.0, 20.0, 1.0, 0.5, 100.0],
+                               'DATETIME': ['2005-01-01', '2005-01-02', '2005-01-03', '2005-01-04', '2005-01-05', '2005-01-06']})
+        counties = pd.DataFrame({'fips': ['06001', '06063', '06115'], 'county': ['Alameda', 'Plumas', 'Yuba']})
+        cls.lookup = CaliforniaYearlyCounty.getCountyLookup(counties)
+        cls.yearlyData = {2005: yearDF}
+        cls.rankings = FireRankings(cls.yearlyData, cls.lookup, k=2)
+        cls.FireAggregator = FireAggregations(cls.yearlyData, counties, None, cls.lookup, cls.rankings)
+
+    def test_topK(self):
+        top = FireRankings.topK(np.array([3.0, nan, 9.0, 1.0, 5.0]), 3)
+        self.assertEqual(top.tolist(), [2, 4, 0])
+
+    def test_getTopCountiesByAcres(self):
+        expected_df = pd.DataFrame({'fips': ['06001', '06063'], 'total_acres_burnt': [20.5, 12.0], 'county': ['Alameda', 'Plumas']})
+        pd.testing.assert_frame_equal(self.rankings.getTopCountiesByAcres(2005), expected_df, check_dtype=False)
+
+    def test_getTopCountiesByAcres_skips_missing_sizes(self):
+        yearDF = pd.DataFrame({'OBJECTID': [1, 2, 3],
+                               'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series([6001, 6001, 6063])),
+                               'FIRE_SIZE': [50.0, nan, 10.0]})
+        expected_df = yearDF['FIRE_SIZE'].groupby(yearDF['STCT_FIPS'].astype(str)).sum().sort_values(ascending=False)
+        acres_burnt = FireRankings.rankCounties(yearDF, self.lookup, 2, 'FIRE_SIZE', 'total_acres_burnt')
+        self.assertEqual(acres_burnt['county'].tolist(), ['Alameda', 'Plumas'])
+        self.assertEqual(acres_burnt['total_acres_burnt'].tolist(), expected_df.tolist())
+
+    def test_getMostAcresBurntFipsByYear_beyond_index(self):
+        acres_burnt = self.FireAggregator.getMostAcresBurntFipsByYear(2005, k=10)
+        self.assertEqual(acres_burnt['county'].tolist(), ['Alameda', 'Plumas', 'Yuba'])
+
+    def test_getMostFiresFipsByYear(self):
+        fire_counts = self.FireAggregator.getMostFiresFipsByYear(2005, k=1)
+        self.assertEqual(fire_counts.columns.tolist(), ['fips', 'fire_count', 'county'])
+        self.assertEqual(fire_counts['fire_count'].tolist(), [2])
+
+    def test_getLargestFiresByYear(self):
+        largest = self.FireAggregator.getLargestFiresByYear(2005, k=2)
+        self.assertEqual(largest['fire'].tolist(), ['1. 06003 (2005-01-06)', '2. Alameda (2005-01-03)'])
+        self.assertEqual(largest['fire_size'].tolist(), [100.0, 20.0])
+
+    def test_getLargestFiresByYear_same_county_and_day(self):
+        yearDF = pd.DataFrame({'OBJECTID': [1, 2, 3],
+                               'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series([6063, 6063, 6001])),
+                               'STAT_CAUSE_DESCR': ['Lightning', 'Lightning', 'Arson'],
+                               'FIRE_SIZE': [500.0, 400.0, 5.0],
+                               'DATETIME': ['2005-08-01', '2005-08-01', '2005-08-02']})
+        largest = FireRankings({2005: yearDF}, self.lookup, k=3).getLargestFires(2005, 3)
+        self.assertEqual(largest['fire'].tolist(), ['1. Plumas (2005-08-01)', '2. Plumas (2005-08-01)', '3. Alameda (2005-08-02)'])
+        chart = ChartCreator({2005: yearDF}, None, None, None, 2005, "show_largest_individual_fires_single_year", self.lookup)
+        self.assertEqual(len(set(chart.DetermineWhichPlot().data[0].x)), 3)                                 # two bars, not one stacked 900 acre fire
+
+    def test_catalystsByCount(self):
+        self.assertEqual(self.FireAggregator.getFireCatalystsByYear(2005)['catalyst'].tolist(), ['Arson', 'Lightning'])
+
+class WeatherFireCorrelations_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        days = pd.date_range('2004-01-01', '2005-12-31')
+        p30 = rng.random(len(days)) * 10
+        cls.daily = pd.DataFrame({'date': days, 'p30': p30,
+                                  'b30': np.roll(p30, 7) * 3 + rng.random(len(days)),
+                                  'f30': -p30 + rng.random(len(days))})
+        # the county's 30 day precipitation (in tenths) follows its 30 day acreage exactly
+        sizes = rng.random(len(days))
+        cls.tmpDir = tempfile.mkdtemp()
+        csvPath = os.path.join(cls.tmpDir, 'precip.csv')
+        pd.DataFrame({'STCT_FIPS': 6063, 'date': days.strftime('%Y%m%d').astype(int), 'station_sum': 0.0,
+                      'past30_ss_sum': pd.Series(sizes).rolling(30, min_periods=1).sum() * 10}).to_csv(csvPath, index=False)
+        fires = pd.DataFrame({'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series([6063] * len(days))),
+                              'DATETIME': days.strftime('%Y-%m-%d'),
+                              'FIRE_SIZE': sizes})
+        store = PrecipitationStore.open(csvPath, os.path.join(cls.tmpDir, 'store'))
+        lookup = CaliforniaYearlyCounty.getCountyLookup(pd.DataFrame({'fips': ['06063'], 'county': ['Plumas']}))
+        cls.correlations = WeatherFireCorrelations(cls.daily, fires, store, lookup)
+        cls.correlations.precompute([2004, 2005])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpDir)
+
+    def test_rollingCorrelation(self):
+        expected = self.daily['p30'].rolling(30).corr(self.daily['b30']).values
+        rolling = WeatherFireCorrelations.rollingCorrelation(self.daily['p30'], self.daily['b30'], 30)
+        np.testing.assert_allclose(rolling, expected)
+
+    def test_rollingCorrelation_without_precipitation(self):
+        # years after 2013 have no precipitation data
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            rolling = WeatherFireCorrelations.rollingCorrelation(np.full(400, nan), self.daily['b30'].values[:400], 30)
+            _lags, cross = WeatherFireCorrelations.crossCorrelation(np.full(400, nan), self.daily['b30'].values[:400], 10)
+        self.assertTrue(np.isnan(rolling).all())
+        self.assertTrue(np.isnan(cross).all())
+
+    def test_correlationPlot_requires_precomputed(self):
+        lookup = self.correlations.countyLookup
+        chart = ChartCreator({}, None, self.daily, None, 2005, "show_precip_fire_correlation", lookup)
+        with self.assertRaises(ValueError):
+            chart.DetermineWhichPlot()
+        chart = ChartCreator({}, None, self.daily, None, 2005, "show_precip_fire_correlation", lookup, correlations=self.correlations)
+        self.assertEqual(len(chart.DetermineWhichPlot().data), 2)
+
+    def test_crossCorrelation(self):
+        x = self.daily['p30'].values - self.daily['p30'].mean()
+        y = self.daily['b30'].values - self.daily['b30'].mean()
+        lags, corr = WeatherFireCorrelations.crossCorrelation(self.daily['p30'], self.daily['b30'], 10)
+        self.assertEqual(lags[np.argmax(corr)], 7)
+        expected = (x[:-3] * y[3:]).sum() / np.sqrt((x * x).sum() * (y * y).sum())
+        self.assertAlmostEqual(corr[lags == 3][0], expected)
+
+    def test_getNational_cached(self):
+        cross, rolling = self.correlations.getNational(2005, 2005)
+        self.assertIs(self.correlations.getNational(2005, 2005)[0], cross)
+        self.assertEqual(cross.columns.tolist(), ['lag', 'b30', 'f30'])
+        self.assertEqual(len(cross), 2 * WeatherFireCorrelations.MAX_LAG + 1)
+        self.assertEqual(len(rolling), 365)
+        self.assertLess(cross.loc[cross['lag'] == 0, 'f30'].iloc[0], -0.9)
+
+    def test_getCounties(self):
+        counties = self.correlations.getCounties(2004, 2005)
+        self.assertEqual(counties.columns.tolist(), ['fips', 'county', 'b30_corr', 'b30_best_lag', 'b30_best_corr',
+                                                     'f30_corr', 'f30_best_lag', 'f30_best_corr'])
+        self.assertEqual(counties['county'].tolist(), ['Plumas'])
+        self.assertAlmostEqual(counties['b30_corr'].iloc[0], 1.0)
+        self.assertEqual(counties['b30_best_lag'].iloc[0], 0)
+
+    def test_getCounties_without_readings(self):
+        days = self.daily['date']
+        csvPath = os.path.join(self.tmpDir, 'no_readings.csv')
+        pd.DataFrame({'STCT_FIPS': 6115, 'date': days.dt.strftime('%Y%m%d').astype(int), 'station_sum': nan,
+                      'past30_ss_sum': nan}).to_csv(csvPath, index=False)
+        fires = pd.DataFrame({'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series([6115] * len(days))),
+                              'DATETIME': days.dt.strftime('%Y-%m-%d'),
+                              'FIRE_SIZE': 1.0})
+        store = PrecipitationStore.open(csvPath, os.path.join(self.tmpDir, 'no_readings'))
+        counties = WeatherFireCorrelations(self.daily, fires, store).getCounties(2004, 2005)
+        for col in WeatherFireCorrelations.FIRE_COLUMNS:
+            self.assertTrue(np.isnan(counties[col + '_best_corr'].iloc[0]))
+            self.assertIs(counties[col + '_best_lag'].iloc[0], pd.NA)                                      # not -MAX_LAG
+
 class MapCreator_Test(unittest.TestCase):
     def test_MakeWildfireMap(self):
         pass
@@ -0,0 +1,82 @@
+import time
+import unittest
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+from Figure_Prerender import MAP_OPTIONS, CHART_OPTIONS, renderMap, renderChart
+from Synthetic_Data import buildSharedData
+
+'''
+Renders the same (year, dropdown) callbacks serially, from a thread pool (gunicorn gthread
+threads sharing one copy of the data) and from forked processes (--preload sync workers), checks
+that every run returns identical figures and that the shared data is left untouched, and prints
+the throughput per worker type. Rendering is CPU bound and holds the GIL, so only the forked
+processes can scale with the number of cores. Uses a synthetic dataset so it runs without the csvs.
+'''
+
+WORKERS = 4
+REPEAT = 2
+
+_SHARED = {}
+
+
+def dataFingerprint(data):
+    frames = list(data['yearlyData'].values()) + list(data['fireCountsByYear'].values()) + [data['daily'], data['caliCounties']]
+    return [int(pd.util.hash_pandas_object(frame).sum()) for frame in frames]
+
+
+def renderCallback(task):
+    # same work as the update_figure / update_chart callbacks in app.py
+    kind, year, dropdown = task
+    if kind == "map":
+        fig = renderMap(_SHARED, year, dropdown)
+    else:
+        fig = renderChart(_SHARED, year, dropdown)
+    return task, fig.to_json()
+
+
+class ConcurrencyStress_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        _SHARED.update(buildSharedData())
+        years = sorted(int(year) for year in _SHARED['years'])
+        cls.tasks = [("map", year, dropdown) for year in years for dropdown in MAP_OPTIONS]
+        cls.tasks += [("chart", year, dropdown) for year in years for dropdown in CHART_OPTIONS]
+        cls.fingerprint = dataFingerprint(_SHARED)
+        cls.expected = dict(map(renderCallback, cls.tasks))
+        cls.throughput = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        for workerType, callbacksPerSecond in cls.throughput.items():
+            print("{0:>10}: {1:7.1f} callbacks/s".format(workerType, callbacksPerSecond))
+
+    def runLoad(self, workerType, pool):
+        load = self.tasks * REPEAT
+        start = time.perf_counter()
+        with pool:
+            results = list(pool.map(renderCallback, load))
+        self.throughput[workerType] = len(load) / (time.perf_counter() - start)
+        for task, figure in results:
+            self.assertEqual(figure, self.expected[task], task)
+        self.assertEqual(dataFingerprint(_SHARED), self.fingerprint)
+
+    def test_serial(self):
+        self.runLoad("serial", ThreadPoolExecutor(max_workers=1))
+
+    def test_threads(self):
+        self.runLoad("gthread", ThreadPoolExecutor(max_workers=WORKERS))
+
+    def test_processes(self):
+        self.runLoad("sync", ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('fork')))
+
+    def test_shared_data_read_only(self):
+        with self.assertRaises(TypeError):
+            _SHARED['yearlyData'][1900] = None
+        with self.assertRaises(TypeError):
+            _SHARED['rankings'].countiesByAcres[1900] = None
+
+
+if __name__ == '__main__':
+    unittest.main()
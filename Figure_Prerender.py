@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build step that renders every map and chart combination of the dashboard
+and writes them to disk as gzip compressed figure JSON.
+
+The figures only depend on (year, dropdown) and the static dataset, so they
+can be produced once at deploy time and the Dash callbacks just read them.
+A manifest records the csvs, start year and FIGURE_VERSION they were rendered
+from, app.py ignores the figures once any of these changed:
+
+    python Figure_Prerender.py --out artifacts/figures --workers 4
+"""
+import os
+import gzip
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from Collection_Aggregation import FirePrecipDataCollection, PrecipitationStore, CaliforniaYearlyCounty, FireAggregations, FireRankings, WeatherFireCorrelations, MapCreator, ChartCreator
+
+'''
+Declaring the paths and start year, app.py reads them from here
+If you change start year it globally changes the amount of data seen in the plots
+'''
+FIREPATH = 'Code/all_usa_fires_cleaned.csv'
+PRECIP_PATH = './data/precip_agg_series.csv'
+PRECIP_STORE = 'artifacts/precip_store'                                                     # memory mapped copy of PRECIP_PATH, built on first use
+PRERENDER_DIR = 'artifacts/figures'
+startYear = 1992
+
+FIGURE_VERSION = 2                                                                           # bump whenever a figure changes so older artifacts are rendered live again
+MANIFEST = 'manifest.json'
+
+# options of the map-dropdown and chart-dropdown components in app.py, the prerender step and the tests use the same values
+MAP_DROPDOWN = [
+    {"label": "Chloropleth map of total fire counts in {startYear}, split by county", "value": "show_full_year_map"},
+    {"label": "Fire counts by month animation", "value": "show_fires_month"},
+]
+CHART_DROPDOWN = [
+    {"label": "Histogram of fire catalysts count (single year)", "value": "show_fire_catalysts_single_year"},
+    {"label": "Most destructive fires (single year)", "value": "show_largest_fires_table_single_year"},
+    {"label": "Largest individual fires (single year)", "value": "show_largest_individual_fires_single_year"},
+    {"label": "Histogram of fire catalysts average (single year)", "value": "show_fire_catalysts_avg_single_year"},
+    {"label": "Fire size over time (single year, Class A-C)", "value": "show_fire_over_time_single_year_C"},
+    {"label": "Fire size over time (single year, Class D-G)", "value": "show_fire_over_time_single_year_D"},
+    {"label": "Fire Size and Precipitation", "value": "show_firesize_v_precip"},
+    {"label": "Average Fire Size (Weekly)", "value": "show_avg_firesize_counts_w"},
+    {"label": "Precipitation and Fire Activity Correlation (by lag)", "value": "show_precip_fire_correlation"},
+]
+MAP_OPTIONS = [option["value"] for option in MAP_DROPDOWN]
+CHART_OPTIONS = [option["value"] for option in CHART_DROPDOWN]
+
+_DATA = {}                                                                                   # filled in the parent before forking the workers
+
+
+def dropdownOptions(dropdown, year):
+    # dcc.Dropdown options with the start year filled into the labels
+    return [dict(option, label=option["label"].format(startYear=year)) for option in dropdown]
+
+
+def loadDashboardData(year, firePath, precipPath, precipStorePath=None):
+    # everything the callbacks read, loaded once and shared by app.py, the prerender workers and the tests
+    DataCollector = FirePrecipDataCollection(year, firePath, precipPath, precipStorePath)
+    fires, years = DataCollector.getFiresData()
+    daily = DataCollector.mergeFirePrecipDataDaily()
+    CountyDataCollector = CaliforniaYearlyCounty(year, fires, years)
+    yearlyData = CountyDataCollector.getYearlyDataDict()
+    cali = CountyDataCollector.getCaliGeoJson()
+    caliCounties = CountyDataCollector.getCountyNames(cali)
+    countyLookup = CountyDataCollector.getCountyLookup(caliCounties)
+    if DataCollector.precipStorePath is not None:
+        correlations = WeatherFireCorrelations(daily, fires, PrecipitationStore.open(DataCollector.precipPath, DataCollector.precipStorePath), countyLookup)
+    else:
+        correlations = WeatherFireCorrelations(daily)
+    correlations.precompute(years)
+    data = {'years': years,
+            'inputPaths': [DataCollector.firePath, DataCollector.precipPath],
+            'daily': daily,
+            'yearlyData': yearlyData,
+            'fireCountsByYear': CountyDataCollector.getFireCountsByYear(),
+            'cali': cali,
+            'caliCounties': caliCounties,
+            'countyLookup': countyLookup,
+            'rankings': FireRankings(yearlyData, countyLookup),
+            'correlations': correlations,
+            'allsize': FireAggregations(yearlyData, caliCounties, daily, countyLookup).getAllFireSizes()}
+    return data
+
+
+def renderMap(data, year, dropdown):
+    MapVisualizer = MapCreator(data['yearlyData'], data['caliCounties'], data['daily'], year, dropdown, data['countyLookup'], data['rankings'])
+    if dropdown == "show_full_year_map":
+        fig = MapVisualizer.MakeWildfireMap(data['cali'], data['fireCountsByYear'].get(year))
+    elif dropdown == "show_fires_month":
+        months = MapVisualizer.getMonthlyCounts(year)
+        fig = MapVisualizer.MakeMonthlyMap(data['cali'], months)
+    return fig
+
+
+def renderChart(data, year, dropdown):
+    ChartVisualizer = ChartCreator(data['yearlyData'], data['caliCounties'], data['daily'], data['allsize'], year, dropdown, data['countyLookup'], data['rankings'], data['correlations'])
+    return ChartVisualizer.DetermineWhichPlot()
+
+
+def figurePath(outDir, kind, year, dropdown):
+    return os.path.join(outDir, "{0}_{1}_{2}.json.gz".format(kind, int(year), dropdown))
+
+
+def loadFigure(outDir, kind, year, dropdown):
+    # returns None when the combination has not been prerendered so the caller can render it live
+    path = figurePath(outDir, kind, year, dropdown)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def buildManifest(year, inputPaths):
+    # what the figures are rendered from, size and mtime of the csvs like PrecipitationStore.open checks
+    inputs = {}
+    for path in inputPaths:
+        stat = os.stat(path)
+        inputs[os.path.basename(path)] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    return {'figure_version': FIGURE_VERSION, 'start_year': int(year), 'inputs': inputs}
+
+
+def readManifest(outDir):
+    path = os.path.join(outDir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def isCurrent(outDir, year, inputPaths):
+    # the prerendered figures can only be served when they were rendered from the same csvs, start year and figure code
+    manifest = readManifest(outDir)
+    return manifest is not None and manifest == buildManifest(year, inputPaths)
+
+
+def _renderToDisk(task):
+    outDir, kind, year, dropdown = task
+    if kind == "map":
+        fig = renderMap(_DATA, year, dropdown)
+    else:
+        fig = renderChart(_DATA, year, dropdown)
+    path = figurePath(outDir, kind, year, dropdown)
+    tmpPath = path + ".tmp"
+    with gzip.open(tmpPath, 'wt', encoding='utf-8', compresslevel=9) as f:
+        f.write(fig.to_json())
+    os.replace(tmpPath, path)                                                                # never leave a half written artifact behind
+    return path, os.path.getsize(path)
+
+
+def prerenderAll(data, outDir, manifest, workers=None):
+    os.makedirs(outDir, exist_ok=True)
+    manifestPath = os.path.join(outDir, MANIFEST)
+    if os.path.exists(manifestPath):                                                         # the old figures stop being served while they are replaced
+        os.remove(manifestPath)
+    tasks = [(outDir, "map", year, dropdown) for year in data['years'] for dropdown in MAP_OPTIONS]
+    tasks += [(outDir, "chart", year, dropdown) for year in data['years'] for dropdown in CHART_OPTIONS]
+    _DATA.update(data)
+    # fork so every worker shares the already loaded data instead of reading the csvs again
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        written = list(pool.map(_renderToDisk, tasks))
+    with open(manifestPath + ".tmp", 'w') as f:                                              # written last, only a complete set of figures is ever marked current
+        json.dump(manifest, f, indent=2)
+    os.replace(manifestPath + ".tmp", manifestPath)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prerender all dashboard figures to compressed JSON.")
+    parser.add_argument('--fires', default=FIREPATH, help="path to the cleaned fires csv")
+    parser.add_argument('--precip', default=PRECIP_PATH, help="path to the precipitation csv")
+    parser.add_argument('--precip-store', default=PRECIP_STORE, help="memory mapped precipitation store, built from --precip if missing")
+    parser.add_argument('--start-year', type=int, default=startYear, help="first year shown in the dashboard")
+    parser.add_argument('--out', default=PRERENDER_DIR, help="directory the figures are written to")
+    parser.add_argument('--workers', type=int, default=None, help="number of render processes (default: cpu count)")
+    args = parser.parse_args()
+
+    manifest = buildManifest(args.start_year, [args.fires, args.precip])
+    data = loadDashboardData(args.start_year, args.fires, args.precip, args.precip_store)
+    written = prerenderAll(data, args.out, manifest, args.workers)
+    totalBytes = sum(size for _path, size in written)
+    print("Wrote {0} figures ({1:.1f} MB) to {2}".format(len(written), totalBytes / 1e6, args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import Figure_Prerender
+from Figure_Prerender import *
+from Synthetic_Data import buildSharedData
+
+
+class Manifest_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.mkdtemp()
+        cls.outDir = os.path.join(cls.tmpDir, 'figures')
+        cls.inputPaths = []
+        for name in ['fires.csv', 'precip.csv']:
+            path = os.path.join(cls.tmpDir, name)
+            with open(path, 'w') as f:
+                f.write('a,b\n1,2\n')
+            cls.inputPaths.append(path)
+        cls.data = buildSharedData()
+        cls.written = prerenderAll(cls.data, cls.outDir, buildManifest(2003, cls.inputPaths), workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpDir)
+
+    def test_prerenderAll_writes_every_figure(self):
+        self.assertEqual(len(self.written), len(self.data['years']) * (len(MAP_OPTIONS) + len(CHART_OPTIONS)))
+        self.assertTrue(isCurrent(self.outDir, 2003, self.inputPaths))
+
+    def test_isCurrent_start_year(self):
+        self.assertFalse(isCurrent(self.outDir, 1992, self.inputPaths))
+
+    def test_isCurrent_figure_version(self):
+        version = Figure_Prerender.FIGURE_VERSION
+        Figure_Prerender.FIGURE_VERSION = version + 1
+        try:
+            self.assertFalse(isCurrent(self.outDir, 2003, self.inputPaths))
+        finally:
+            Figure_Prerender.FIGURE_VERSION = version
+
+    def test_isCurrent_input_changed(self):
+        path = os.path.join(self.tmpDir, 'refreshed.csv')
+        shutil.copy(self.inputPaths[1], path)
+        manifestDir = os.path.join(self.tmpDir, 'refreshed')
+        os.makedirs(manifestDir)
+        with open(os.path.join(manifestDir, MANIFEST), 'w') as f:
+            json.dump(buildManifest(2003, [self.inputPaths[0], path]), f)
+        self.assertTrue(isCurrent(manifestDir, 2003, [self.inputPaths[0], path]))
+        with open(path, 'a') as f:
+            f.write('3,4\n')
+        self.assertFalse(isCurrent(manifestDir, 2003, [self.inputPaths[0], path]))
+
+    def test_isCurrent_without_manifest(self):
+        self.assertFalse(isCurrent(self.tmpDir, 2003, self.inputPaths))
+
+
+class RenderToDisk_Test(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.outDir = tempfile.mkdtemp()
+        cls.data = buildSharedData()
+        cls.year = sorted(int(year) for year in cls.data['years'])[0]
+        Figure_Prerender._DATA.update(cls.data)
+
+    @classmethod
+    def tearDownClass(cls):
+        Figure_Prerender._DATA.clear()
+        shutil.rmtree(cls.outDir)
+
+    def test_round_trip_map(self):
+        path, size = Figure_Prerender._renderToDisk((self.outDir, "map", self.year, "show_full_year_map"))
+        self.assertEqual(path, figurePath(self.outDir, "map", self.year, "show_full_year_map"))
+        self.assertEqual(size, os.path.getsize(path))
+        expected = json.loads(renderMap(self.data, self.year, "show_full_year_map").to_json())
+        self.assertEqual(loadFigure(self.outDir, "map", self.year, "show_full_year_map"), expected)
+
+    def test_round_trip_chart(self):
+        for dropdown in CHART_OPTIONS:
+            Figure_Prerender._renderToDisk((self.outDir, "chart", self.year, dropdown))
+            expected = json.loads(renderChart(self.data, self.year, dropdown).to_json())
+            self.assertEqual(loadFigure(self.outDir, "chart", self.year, dropdown), expected, dropdown)
+        self.assertFalse(any(name.endswith('.tmp') for name in os.listdir(self.outDir)))
+
+    def test_loadFigure_missing(self):
+        self.assertIsNone(loadFigure(self.outDir, "chart", 1900, "show_fire_catalysts_single_year"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load generator that replays the dashboard's callback traffic and reports how
+one instance holds up: p50/p95/p99 latency, throughput and response bytes.
+
+The callbacks and the year/dropdown values are read from the running app
+(/_dash-dependencies and /_dash-layout), so the same requests the browser
+sends to /_dash-update-component are replayed, in either callback mode.
+
+    python Load_Generator.py --requests 500 --concurrency 8                      # Flask test client on app.server
+    gunicorn app:server --preload --workers 4 &
+    python Load_Generator.py --url http://127.0.0.1:8000 --requests 500 --concurrency 8
+"""
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+UPDATE_PATH = '/_dash-update-component'
+
+
+class TestClientTransport:
+
+    def __init__(self):
+        from app import server                                                              # loads the dataset, only needed without --url
+        self.server = server
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        if not hasattr(self.local, 'client'):                                                # one client per thread
+            self.local.client = self.server.test_client()
+        if method == 'GET':
+            response = self.local.client.get(path)
+        else:
+            response = self.local.client.post(path, data=body, content_type='application/json')
+        content = response.get_data()
+        return response.status_code, content, len(content)
+
+
+class HttpTransport:
+
+    def __init__(self, url, compressed=False):
+        self.url = url.rstrip('/')
+        self.headers = {'Content-Type': 'application/json'}
+        if compressed:
+            self.headers['Accept-Encoding'] = 'gzip'                                        # bytes are then counted as sent over the wire
+
+    def request(self, method, path, body=None):
+        req = Request(self.url + path, data=body, headers=self.headers, method=method)
+        try:
+            with urlopen(req) as response:
+                status, encoding, raw = response.status, response.headers.get('Content-Encoding'), response.read()
+        except HTTPError as error:
+            status, encoding, raw = error.code, error.headers.get('Content-Encoding'), error.read()
+        content = gzip.decompress(raw) if encoding == 'gzip' else raw
+        return status, content, len(raw)
+
+
+def findComponents(node, found=None):
+    # id -> props of every component in the serialized layout
+    if found is None:
+        found = {}
+    if isinstance(node, dict):
+        props = node.get('props', {})
+        if 'id' in props:
+            found[props['id']] = props
+        findComponents(props.get('children'), found)
+    elif isinstance(node, list):
+        for child in node:
+            findComponents(child, found)
+    return found
+
+
+def buildScenarios(dependencies, layout):
+    '''
+    One scenario per server side callback driven by the year slider and a dropdown,
+    either directly or through the map-request / chart-request stores of the
+    clientside mode, which only reach the server for figures missing from the bundle
+    '''
+    components = findComponents(layout)
+    years = [int(year) for year in components['year-slider']['marks']]
+    bundle = components.get('client-bundle', {}).get('data') or {}
+    scenarios = []
+    for dependency in dependencies:
+        if dependency.get('clientside_function'):
+            continue
+        inputs = dependency['inputs']
+        ids = [item['id'] for item in inputs]
+        if 'year-slider' in ids:
+            dropdown = [i for i in ids if i.endswith('-dropdown')][0]
+            values = [option['value'] for option in components[dropdown]['options']]
+        elif len(ids) == 1 and ids[0].endswith('-request'):
+            dropdown = ids[0].replace('-request', '-dropdown')
+            bundled = bundle.get('maps' if dropdown == 'map-dropdown' else 'charts', {})
+            values = [option['value'] for option in components[dropdown]['options'] if option['value'] not in bundled]
+        else:
+            continue
+        if values:
+            scenarios.append({'output': dependency['output'], 'inputs': inputs, 'dropdown': dropdown, 'years': years, 'values': values})
+    return scenarios
+
+
+def makePayload(scenario, rng):
+    year = rng.choice(scenario['years'])
+    value = rng.choice(scenario['values'])
+    inputs = []
+    for item in scenario['inputs']:
+        if item['id'] == 'year-slider':
+            inputs.append(dict(item, value=year))
+        elif item['id'] == scenario['dropdown']:
+            inputs.append(dict(item, value=value))
+        else:
+            inputs.append(dict(item, value={'year': year, 'dropdown': value}))
+    componentId, prop = scenario['output'].rsplit('.', 1)
+    payload = {'output': scenario['output'],
+               'outputs': {'id': componentId, 'property': prop},
+               'inputs': inputs,
+               'changedPropIds': [inputs[0]['id'] + '.' + inputs[0]['property']],
+               'state': []}
+    return json.dumps(payload).encode('utf-8')
+
+
+def runLoad(transport, scenarios, requests, concurrency, seed=0):
+    rng = random.Random(seed)
+    work = [(scenario['output'], makePayload(scenario, rng)) for scenario in (rng.choice(scenarios) for _ in range(requests))]
+
+    def send(item):
+        output, body = item
+        start = time.perf_counter()
+        status, _content, size = transport.request('POST', UPDATE_PATH, body)
+        return output, time.perf_counter() - start, status, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, work))
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    rows = []
+    groups = {'all': results}
+    for output in sorted({result[0] for result in results}):
+        groups[output] = [result for result in results if result[0] == output]
+    for name, group in groups.items():
+        latencies = np.array([result[1] for result in group]) * 1000
+        sizes = np.array([result[3] for result in group])
+        errors = sum(1 for result in group if result[2] >= 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        rows.append({'callback': name, 'requests': len(group), 'errors': errors,
+                     'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                     'req_per_s': len(group) / elapsed,
+                     'mean_kb': sizes.mean() / 1024, 'total_mb': sizes.sum() / 1024 ** 2})
+    return rows
+
+
+def printReport(rows, elapsed, concurrency):
+    print("{0} requests in {1:.1f}s with {2} concurrent clients".format(rows[0]['requests'], elapsed, concurrency))
+    header = "{0:<28}{1:>9}{2:>7}{3:>10}{4:>10}{5:>10}{6:>10}{7:>10}{8:>10}"
+    print(header.format('callback', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'mean KB', 'total MB'))
+    line = "{callback:<28}{requests:>9}{errors:>7}{p50_ms:>10.1f}{p95_ms:>10.1f}{p99_ms:>10.1f}{req_per_s:>10.1f}{mean_kb:>10.1f}{total_mb:>10.2f}"
+    for row in rows:
+        print(line.format(**row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Dash callback traffic and report latency, throughput and response size.")
+    parser.add_argument('--url', default=None, help="base url of a running instance, e.g. a local gunicorn (default: Flask test client)")
+    parser.add_argument('--requests', type=int, default=200, help="number of callback requests to send")
+    parser.add_argument('--concurrency', type=int, default=4, help="number of concurrent clients")
+    parser.add_argument('--gzip', action='store_true', help="ask for gzip responses (--url only)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the random year/dropdown combinations")
+    parser.add_argument('--json', default=None, help="also write the report rows to this file")
+    args = parser.parse_args()
+
+    transport = HttpTransport(args.url, args.gzip) if args.url else TestClientTransport()
+    _status, dependencies, _size = transport.request('GET', '/_dash-dependencies')
+    _status, layout, _size = transport.request('GET', '/_dash-layout')
+    scenarios = buildScenarios(json.loads(dependencies), json.loads(layout))
+    if not scenarios:
+        raise SystemExit("No server side year/dropdown callbacks found")
+
+    results, elapsed = runLoad(transport, scenarios, args.requests, args.concurrency, args.seed)
+    rows = summarize(results, elapsed)
+    printReport(rows, elapsed, args.concurrency)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import json
+import random
+import unittest
+import numpy as np
+from Load_Generator import *
+
+'''
+Hand written /_dash-dependencies and /_dash-layout responses of app.py in both callback
+modes, so the scenarios can be checked without loading the dataset
+'''
+
+SLIDER = {'type': 'Slider', 'namespace': 'dash_core_components',
+          'props': {'id': 'year-slider', 'marks': {'2004': '2004', '2005': '2005'}, 'value': 2004}}
+MAP_DROPDOWN = {'type': 'Dropdown', 'namespace': 'dash_core_components',
+                'props': {'id': 'map-dropdown', 'value': 'show_full_year_map',
+                          'options': [{'label': 'Map', 'value': 'show_full_year_map'},
+                                      {'label': 'Animation', 'value': 'show_fires_month'}]}}
+CHART_DROPDOWN = {'type': 'Dropdown', 'namespace': 'dash_core_components',
+                  'props': {'id': 'chart-dropdown', 'value': 'show_fire_catalysts_single_year',
+                            'options': [{'label': 'Catalysts', 'value': 'show_fire_catalysts_single_year'},
+                                        {'label': 'Class A-C', 'value': 'show_fire_over_time_single_year_C'}]}}
+
+
+def layout(*extra):
+    return {'type': 'Div', 'namespace': 'dash_html_components',
+            'props': {'id': 'root', 'children': [
+                {'type': 'Div', 'namespace': 'dash_html_components', 'props': {'children': [SLIDER, MAP_DROPDOWN]}},
+                {'type': 'Div', 'namespace': 'dash_html_components', 'props': {'children': CHART_DROPDOWN}},
+            ] + list(extra)}}
+
+
+def dependency(output, inputs, clientside=False):
+    return {'output': output,
+            'inputs': [{'id': componentId, 'property': prop} for componentId, prop in inputs],
+            'state': [],
+            'clientside_function': {'namespace': 'wildfires', 'function_name': 'f'} if clientside else None}
+
+
+SERVER_DEPENDENCIES = [
+    dependency('cali-wildfires.figure', [('year-slider', 'value'), ('map-dropdown', 'value')]),
+    dependency('selected-data.figure', [('year-slider', 'value'), ('chart-dropdown', 'value')]),
+]
+CLIENTSIDE_DEPENDENCIES = [
+    dependency('map-request.data', [('year-slider', 'value'), ('map-dropdown', 'value')], clientside=True),
+    dependency('map-server-figure.data', [('map-request', 'data')]),
+    dependency('cali-wildfires.figure', [('year-slider', 'value'), ('map-dropdown', 'value'), ('map-server-figure', 'data')], clientside=True),
+    dependency('chart-request.data', [('year-slider', 'value'), ('chart-dropdown', 'value')], clientside=True),
+    dependency('chart-server-figure.data', [('chart-request', 'data')]),
+    dependency('selected-data.figure', [('year-slider', 'value'), ('chart-dropdown', 'value'), ('chart-server-figure', 'data')], clientside=True),
+]
+BUNDLE = {'type': 'Store', 'namespace': 'dash_core_components',
+          'props': {'id': 'client-bundle',
+                    'data': {'maps': {'show_full_year_map': {}, 'show_fires_month': {}},
+                             'charts': {'show_fire_catalysts_single_year': {}}}}}
+
+
+class BuildScenarios_Test(unittest.TestCase):
+
+    def test_findComponents(self):
+        components = findComponents(layout())
+        self.assertEqual(sorted(components), ['chart-dropdown', 'map-dropdown', 'root', 'year-slider'])
+
+    def test_server_mode(self):
+        scenarios = buildScenarios(SERVER_DEPENDENCIES, layout())
+        self.assertEqual([scenario['output'] for scenario in scenarios], ['cali-wildfires.figure', 'selected-data.figure'])
+        self.assertEqual(scenarios[0]['dropdown'], 'map-dropdown')
+        self.assertEqual(scenarios[0]['years'], [2004, 2005])
+        self.assertEqual(scenarios[0]['values'], ['show_full_year_map', 'show_fires_month'])
+        self.assertEqual(scenarios[1]['values'], ['show_fire_catalysts_single_year', 'show_fire_over_time_single_year_C'])
+
+    def test_clientside_mode(self):
+        # clientside callbacks are skipped and figures drawn from the bundle never reach the server
+        scenarios = buildScenarios(CLIENTSIDE_DEPENDENCIES, layout(BUNDLE))
+        self.assertEqual(len(scenarios), 1)
+        self.assertEqual(scenarios[0]['output'], 'chart-server-figure.data')
+        self.assertEqual(scenarios[0]['dropdown'], 'chart-dropdown')
+        self.assertEqual(scenarios[0]['values'], ['show_fire_over_time_single_year_C'])
+
+
+class MakePayload_Test(unittest.TestCase):
+
+    def test_server_mode(self):
+        scenario = buildScenarios(SERVER_DEPENDENCIES, layout())[1]
+        payload = json.loads(makePayload(scenario, random.Random(0)))
+        self.assertEqual(sorted(payload), ['changedPropIds', 'inputs', 'output', 'outputs', 'state'])
+        self.assertEqual(payload['outputs'], {'id': 'selected-data', 'property': 'figure'})
+        self.assertEqual(payload['changedPropIds'], ['year-slider.value'])
+        year, dropdown = payload['inputs']
+        self.assertEqual((year['id'], year['property']), ('year-slider', 'value'))
+        self.assertIn(year['value'], scenario['years'])
+        self.assertEqual(dropdown['id'], 'chart-dropdown')
+        self.assertIn(dropdown['value'], scenario['values'])
+
+    def test_clientside_mode(self):
+        scenario = buildScenarios(CLIENTSIDE_DEPENDENCIES, layout(BUNDLE))[0]
+        payload = json.loads(makePayload(scenario, random.Random(0)))
+        self.assertEqual(payload['output'], 'chart-server-figure.data')
+        self.assertEqual(payload['changedPropIds'], ['chart-request.data'])
+        self.assertEqual(payload['inputs'][0]['value'], {'year': payload['inputs'][0]['value']['year'],
+                                                         'dropdown': 'show_fire_over_time_single_year_C'})
+        self.assertIn(payload['inputs'][0]['value']['year'], scenario['years'])
+
+    def test_seeded(self):
+        scenario = buildScenarios(SERVER_DEPENDENCIES, layout())[0]
+        self.assertEqual(makePayload(scenario, random.Random(3)), makePayload(scenario, random.Random(3)))
+
+
+class Summarize_Test(unittest.TestCase):
+
+    def test_rows(self):
+        # (output, seconds, status, bytes)
+        results = [('a', latency / 1000, 200, 1024) for latency in range(1, 101)]
+        results += [('b', 0.5, 500, 2048), ('b', 0.5, 200, 2048)]
+        rows = summarize(results, elapsed=2.0)
+        self.assertEqual([row['callback'] for row in rows], ['all', 'a', 'b'])
+        everything, a, b = rows
+        self.assertEqual(everything['requests'], 102)
+        self.assertEqual(everything['errors'], 1)
+        self.assertAlmostEqual(everything['req_per_s'], 51.0)
+        np.testing.assert_allclose([a['p50_ms'], a['p95_ms'], a['p99_ms']], np.percentile(np.arange(1, 101), [50, 95, 99]))
+        self.assertAlmostEqual(a['mean_kb'], 1.0)
+        self.assertAlmostEqual(b['p99_ms'], 500.0)
+        self.assertAlmostEqual(b['total_mb'], 4096 / 1024 ** 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from Collection_Aggregation import *
+
+'''
+Small synthetic dashboard dataset (three years of fires in six California counties) shared
+by the tests that render figures, so they run without the csvs and the geojson download.
+Returns a dict with the same keys renderMap/renderChart read from Figure_Prerender.loadDashboardData.
+'''
+
+
+def buildSharedData():
+    rng = np.random.default_rng(0)
+    n = 6000
+    codes = [6001, 6003, 6063, 6075, 6111, 6115]
+    dates = pd.Timestamp('2003-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365, n), unit='D')
+    fires = pd.DataFrame({'OBJECTID': np.arange(1, n + 1),
+                          'FIRE_YEAR': dates.year,
+                          'STAT_CAUSE_DESCR': rng.choice(['Arson', 'Lightning', 'Debris Burning', 'Miscellaneous'], n),
+                          'FIRE_SIZE': np.round(rng.exponential(80, n), 2),
+                          'STCT_FIPS': FirePrecipDataCollection.padFips(pd.Series(rng.choice(codes, n))),
+                          'DATETIME': dates.strftime('%Y-%m-%d'),
+                          'MONTH': dates.month_name()})
+    geojson = {'type': 'FeatureCollection',
+               'features': [{'type': 'Feature', 'id': '{0:0>5}'.format(code),
+                             'properties': {'STATE': '06', 'COUNTY': '{0:0>5}'.format(code)[2:], 'NAME': 'County ' + str(code)},
+                             'geometry': {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 0], [1, 1], [0, 0]]]}} for code in codes]}
+    days = pd.date_range('2003-01-01', '2005-12-31')
+    daily = pd.DataFrame({'date': days})
+    for col in ['b30', 'f30', 'p30', 'a7', 'f7']:
+        daily[col] = rng.random(len(days)) * 100
+
+    years = fires['FIRE_YEAR'].unique()
+    CountyDataCollector = CaliforniaYearlyCounty(2003, fires, years)
+    CountyDataCollector.getCaliGeoJson = lambda: geojson
+    yearlyData = CountyDataCollector.getYearlyDataDict()
+    caliCounties = CountyDataCollector.getCountyNames(geojson)
+    countyLookup = CountyDataCollector.getCountyLookup(caliCounties)
+    rankings = FireRankings(yearlyData, countyLookup)
+    correlations = WeatherFireCorrelations(daily)
+    correlations.precompute(years)
+    return {'years': years,
+            'yearlyData': yearlyData,
+            'fireCountsByYear': CountyDataCollector.getFireCountsByYear(),
+            'cali': geojson,
+            'caliCounties': caliCounties,
+            'countyLookup': countyLookup,
+            'rankings': rankings,
+            'correlations': correlations,
+            'daily': daily,
+            'allsize': FireAggregations(yearlyData, caliCounties, daily, countyLookup).getAllFireSizes()}
@@ -1,44 +1,45 @@
+import os
+import warnings
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
-from Collection_Aggregation import FirePrecipDataCollection, CaliforniaYearlyCounty, FireAggregations, MapCreator, ChartCreator
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash.exceptions import PreventUpdate
+from Figure_Prerender import FIREPATH, PRECIP_PATH, PRECIP_STORE, PRERENDER_DIR, startYear
+from Figure_Prerender import MAP_DROPDOWN, CHART_DROPDOWN, dropdownOptions, loadDashboardData, renderMap, renderChart, loadFigure, isCurrent
+from Client_Bundle import buildClientBundle
 
 app = dash.Dash(__name__)
 server = app.server
 
 '''
-Declaring the paths and start year
-If you change start year it globally changes the amount of data seen in the plots
+The csv paths and the start year are declared once in Figure_Prerender.py, so the app and
+the prerendered figures always agree on them. Only the generated artifacts can be moved:
+PRECIP_STORE is the memory mapped copy of PRECIP_PATH, built on first start, and PRERENDER_DIR
+is written by Figure_Prerender.py at deploy time. Figures found there are served as is while
+its manifest matches the csvs, start year and figure version, anything missing or outdated is
+rendered live by the callbacks below
 '''
-FIREPATH = 'Code/all_usa_fires_cleaned.csv'
-PRECIP_PATH = './data/precip_agg_series.csv'
-startYear = 1992
+PRECIP_STORE = os.environ.get('PRECIP_STORE', PRECIP_STORE)
+PRERENDER_DIR = os.environ.get('PRERENDER_DIR', PRERENDER_DIR)
 
 '''
-Creating a data collector object and obtaining the filtered fires, years,
-precipitation, and daily precipitation datasets
+With CLIENTSIDE_CALLBACKS=1 a compact aggregate bundle is sent to the browser once
+and the slider/dropdown interactions it covers are handled without a server roundtrip
 '''
-DataCollector = FirePrecipDataCollection(startYear, FIREPATH, PRECIP_PATH)
-fires, years = DataCollector.getFiresData()
-daily = DataCollector.mergeFirePrecipDataDaily()
+CLIENTSIDE_CALLBACKS = os.environ.get('CLIENTSIDE_CALLBACKS', '0') == '1'
 
 '''
-Creating a county data collector object and obtaining the yearly data by county,
-and the cali geojson objects by year
+Loading the fires, daily precipitation, yearly county data, rankings and correlations
+once, the callbacks below only read them
 '''
-CountyDataCollector = CaliforniaYearlyCounty(startYear, fires, years)
-yearlyData = CountyDataCollector.getYearlyDataDict()
-fireCountsByYear = CountyDataCollector.getFireCountsByYear()
-cali = CountyDataCollector.getCaliGeoJson()
-caliCounties = CountyDataCollector.getCountyNames(cali)
+data = loadDashboardData(startYear, FIREPATH, PRECIP_PATH, PRECIP_STORE)
+years = data['years']
 
+prerenderedCurrent = isCurrent(PRERENDER_DIR, startYear, data['inputPaths'])
+if not prerenderedCurrent and os.path.isdir(PRERENDER_DIR):
+    warnings.warn("Prerendered figures in " + PRERENDER_DIR + " do not match the current data or code, rendering figures live")
 
-'''
-Creating a fire aggregator object that will be used to aggregate information for the different charts
-'''
-FireAggregator = FireAggregations(yearlyData, caliCounties, daily)
-allsize = FireAggregator.getAllFireSizes()
 description = (
     "Between " + str(startYear) + " and 2015, there were an estimated 1.88 Million"
     " wildfires across the US. This map explores the correlations"
@@ -87,16 +88,7 @@ app.layout = html.Div(
                         children=[
                             html.P(id="map-selector", children="Select map:"),
                             dcc.Dropdown(
-                                options=[
-                                    {
-                                        "label": "Chloropleth map of total fire counts in " + str(startYear) + ", split by county",
-                                        "value": "show_full_year_map",
-                                    },
-                                    {
-                                        "label": "Fire counts by month animation",
-                                        "value": "show_fires_month",
-                                    },
-                                ],
+                                options=dropdownOptions(MAP_DROPDOWN, startYear),
                                 value="show_full_year_map",
                                 id="map-dropdown",
                             ),
@@ -121,38 +113,7 @@ app.layout = html.Div(
                     children=[
                         html.P(id="chart-selector", children="Select chart:"),
                         dcc.Dropdown(
-                            options=[
-                                {
-                                    "label": "Histogram of fire catalysts count (single year)",
-                                    "value": "show_fire_catalysts_single_year",
-                                },
-                                {
-                                    "label": "Most destructive fires (single year)",
-                                    "value": "show_largest_fires_table_single_year",
-                                },
-                                {
-                                    "label": "Histogram of fire catalysts average (single year)",
-                                    "value": "show_fire_catalysts_avg_single_year",
-                                },
-                                {
-                                    "label": "Fire size over time (single year, Class A-C)",
-                                    "value": "show_fire_over_time_single_year_C",
-                                },
-                                {
-                                    "label": "Fire size over time (single year, Class D-G)",
-                                    "value": "show_fire_over_time_single_year_D",
-                                },
-                                {
-                                    "label": "Fire Size and Precipitation",
-                                    "value": "show_firesize_v_precip",
-                                },
-
-                                {
-                                    "label": "Average Fire Size (Weekly)",
-                                    "value": "show_avg_firesize_counts_w",
-                                },
-
-                            ],
+                            options=dropdownOptions(CHART_DROPDOWN, startYear),
                             value="show_fire_catalysts_single_year",
                             id="chart-dropdown",
                         ),
@@ -176,37 +137,102 @@ app.layout = html.Div(
         ],
 )
 
+if CLIENTSIDE_CALLBACKS:
+    clientBundle = buildClientBundle(years, data['fireCountsByYear'], data['yearlyData'], data['caliCounties'], data['daily'], data['allsize'], data['countyLookup'], data['rankings'])
+    app.layout.children += [
+        dcc.Store(id='client-bundle', data=clientBundle),
+        dcc.Store(id='map-request'),
+        dcc.Store(id='map-server-figure'),
+        dcc.Store(id='chart-request'),
+        dcc.Store(id='chart-server-figure'),
+    ]
 
 
-@app.callback(
-    Output('cali-wildfires', 'figure'),
-    [
-    Input('year-slider', 'value'),
-    Input('map-dropdown', 'value')
-     ],
-)
-def update_figure(selected_year, map_dropdown):
-    MapVisualizer = MapCreator(yearlyData, caliCounties, daily, selected_year, map_dropdown)
-    if map_dropdown == "show_full_year_map":
-        #filtered_fires_by_fips = FireAggregator.getFireCountsByYear(selected_year)
-        filtered_fires_by_fips = fireCountsByYear.get(selected_year)
-        fig = MapVisualizer.MakeWildfireMap(cali, filtered_fires_by_fips)
-    elif map_dropdown == "show_fires_month":
-        months = FireAggregator.getMonthlyCounts(selected_year)
-        fig = MapVisualizer.MakeMonthlyMap(cali, months)
-    return fig
-
-@app.callback(
-    Output("selected-data", "figure"),
-    [
+def render_map(selected_year, map_dropdown):
+    if prerenderedCurrent:
+        fig = loadFigure(PRERENDER_DIR, "map", selected_year, map_dropdown)
+        if fig is not None:
+            return fig
+    return renderMap(data, selected_year, map_dropdown)
+
+def render_chart(selected_year, chart_dropdown):
+    if prerenderedCurrent:
+        fig = loadFigure(PRERENDER_DIR, "chart", selected_year, chart_dropdown)
+        if fig is not None:
+            return fig
+    return renderChart(data, selected_year, chart_dropdown)
+
+if CLIENTSIDE_CALLBACKS:
+    '''
+    The browser draws everything in the bundle itself (assets/clientside.js) and only
+    writes to map-request / chart-request when it needs a figure from the server
+    '''
+    app.clientside_callback(
+        ClientsideFunction(namespace='wildfires', function_name='mapRequest'),
+        Output('map-request', 'data'),
+        [Input('year-slider', 'value'), Input('map-dropdown', 'value')],
+        [State('client-bundle', 'data')],
+    )
+
+    @app.callback(
+        Output('map-server-figure', 'data'),
+        [Input('map-request', 'data')],
+    )
+    def update_figure(request):
+        if request is None:
+            raise PreventUpdate
+        return dict(request, figure=render_map(request['year'], request['dropdown']))
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='wildfires', function_name='updateMap'),
+        Output('cali-wildfires', 'figure'),
+        [Input('year-slider', 'value'), Input('map-dropdown', 'value'), Input('map-server-figure', 'data')],
+        [State('client-bundle', 'data')],
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='wildfires', function_name='chartRequest'),
+        Output('chart-request', 'data'),
+        [Input('year-slider', 'value'), Input('chart-dropdown', 'value')],
+        [State('client-bundle', 'data')],
+    )
+
+    @app.callback(
+        Output('chart-server-figure', 'data'),
+        [Input('chart-request', 'data')],
+    )
+    def update_chart(request):
+        if request is None:
+            raise PreventUpdate
+        return dict(request, figure=render_chart(request['year'], request['dropdown']))
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='wildfires', function_name='updateChart'),
+        Output('selected-data', 'figure'),
+        [Input('year-slider', 'value'), Input('chart-dropdown', 'value'), Input('chart-server-figure', 'data')],
+        [State('client-bundle', 'data')],
+    )
+
+else:
+    @app.callback(
+        Output('cali-wildfires', 'figure'),
+        [
         Input('year-slider', 'value'),
-        Input("chart-dropdown", "value"),
-    ],
-)
-def update_chart(selected_year, chart_dropdown):
-    ChartVisualizer = ChartCreator(yearlyData, caliCounties, daily, allsize, selected_year, chart_dropdown)
-    fig = ChartVisualizer.DetermineWhichPlot()
-    return fig
+        Input('map-dropdown', 'value')
+         ],
+    )
+    def update_figure(selected_year, map_dropdown):
+        return render_map(selected_year, map_dropdown)
+
+    @app.callback(
+        Output("selected-data", "figure"),
+        [
+            Input('year-slider', 'value'),
+            Input("chart-dropdown", "value"),
+        ],
+    )
+    def update_chart(selected_year, chart_dropdown):
+        return render_chart(selected_year, chart_dropdown)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,91 @@
+/*
+ * Clientside callbacks used when app.py runs with CLIENTSIDE_CALLBACKS=1.
+ *
+ * The figures listed in the bundle (see Client_Bundle.py) are rebuilt in the
+ * browser from the precomputed aggregates. Everything else is requested from
+ * the server through the map-request / chart-request stores.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    wildfires: {
+        // only ask the server for figures the bundle cannot draw
+        mapRequest: function(year, dropdown, bundle) {
+            if (!bundle || bundle.maps[dropdown]) {
+                return window.dash_clientside.no_update;
+            }
+            return {year: year, dropdown: dropdown};
+        },
+
+        chartRequest: function(year, dropdown, bundle) {
+            if (!bundle || bundle.charts[dropdown]) {
+                return window.dash_clientside.no_update;
+            }
+            return {year: year, dropdown: dropdown};
+        },
+
+        updateMap: function(year, dropdown, serverFigure, bundle) {
+            var spec = bundle && bundle.maps[dropdown];
+            if (!spec) {
+                return fromServer(serverFigure, year, dropdown);
+            }
+            // counts are aligned with bundle.counties, counties without fires that year are left out
+            var counts = bundle.years[String(year)].counts.fire_count;
+            var counties = bundle.counties;
+            var fig = copy(spec.figure);
+            fig.data[0].locations = [];
+            fig.data[0].z = [];
+            fig.data[0].text = [];
+            for (var i = 0; i < counts.length; i++) {
+                if (counts[i] > 0) {
+                    fig.data[0].locations.push(counties.fips[i]);
+                    fig.data[0].z.push(counts[i]);
+                    fig.data[0].text.push(counties.county[i]);
+                }
+            }
+            return fig;
+        },
+
+        updateChart: function(year, dropdown, serverFigure, bundle) {
+            var spec = bundle && bundle.charts[dropdown];
+            if (!spec) {
+                return fromServer(serverFigure, year, dropdown);
+            }
+            var fig = copy(spec.figure);
+            if (spec.kind === 'bar') {
+                var table = bundle.years[String(year)][spec.table];
+                fig.data[0].x = table[spec.x];
+                fig.data[0].y = table[spec.y];
+                fig.layout.title.text = spec.title + ', <b>' + year + '</b>';
+            } else {
+                var daily = bundle.daily;
+                var prefix = String(year) + '-';
+                var start = 0;
+                while (start < daily.date.length && daily.date[start].lastIndexOf(prefix, 0) !== 0) {
+                    start++;
+                }
+                var end = start;
+                while (end < daily.date.length && daily.date[end].lastIndexOf(prefix, 0) === 0) {
+                    end++;
+                }
+                var dates = daily.date.slice(start, end);
+                fig.data[0].x = dates;
+                fig.data[0].y = daily[spec.y1].slice(start, end);
+                fig.data[1].x = dates;
+                fig.data[1].y = daily[spec.y2].slice(start, end);
+                fig.layout.title.text = spec.titles[String(year)];
+            }
+            return fig;
+        }
+    }
+});
+
+function copy(figure) {
+    return JSON.parse(JSON.stringify(figure));
+}
+
+// the server answers asynchronously, ignore answers for a selection that is no longer shown
+function fromServer(serverFigure, year, dropdown) {
+    if (!serverFigure || serverFigure.year !== year || serverFigure.dropdown !== dropdown) {
+        return window.dash_clientside.no_update;
+    }
+    return serverFigure.figure;
+}